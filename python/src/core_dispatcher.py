@@ -41,11 +41,14 @@ import traceback
 import shutil
 import pickle
 import stat
+import math
 
 import coupling_tools
 
 script_name = 'core_dispatcher.py'
 wrapper_launcher_script_name = "wrapper_launcher.py"
+pool_worker_script_name = "pool_worker.py"
+fork_server_script_name = "fork_server.py"
 
 #coupling_tools_script_name = "coupling_tools.py"
 coupling_tools_script_path = coupling_tools.__file__
@@ -53,6 +56,11 @@ coupling_tools_script_name = os.path.basename(coupling_tools_script_path)
 
 # name of the user wrapper when renamed
 user_wrapper = "user_wrapper"
+# the user wrapper module, once imported (common workdir only)
+user_wrapper_module = None
+# maximum waiting time (s) of a batch of points asked to the frontal host
+# (dynamic schedule): the frontal host has probably been stopped
+batch_timeout = 600
 
 
 class CoreDispatcher(object):
@@ -67,6 +75,24 @@ class CoreDispatcher(object):
         wd_host_out: ouput data (out sample...)
         """
 
+        self.mutex_next_point = threading.Lock()
+        # period (s) of the check of the next batch file
+        self.batch_poll_time = 0.1
+
+        # long-lived worker processes (launch_mode 'pool'), one per thread
+        self.workers = {}
+        # process that forks the points (launch_mode 'fork')
+        self.fork_server = None
+        # dir where the workers are launched
+        self.workers_workdir = wd_host_in.workdir
+        # session: the workers are kept for the next samples (see
+        # close_workers)
+        self.keep_workers = False
+
+        self.set_sample(wd_host_in, wd_host_out)
+
+    def set_sample(self, wd_host_in, wd_host_out):
+        """ give the next sample to compute (session) """
         self.wd_host_in = wd_host_in
         self.wd_host_out = wd_host_out
 
@@ -79,7 +105,12 @@ class CoreDispatcher(object):
         self.sample_size = len(wd_host_in.sample)
 
         self.next_point = 0
-        self.mutex_next_point = threading.Lock()
+
+        # dynamic schedule: global indices of the points of the sample,
+        # which grows with each batch received from the frontal host
+        self.global_ids = None
+        self.batch_num = 0
+        self.last_batch = True
 
     def exec_sample(self):
         """ exec the sample on localhost """
@@ -95,12 +126,28 @@ class CoreDispatcher(object):
         # create and launch threads
         threads = []
         nb_thread = min(self.sample_size, max(1, self.wd_host_in.n_cores))
+        if self.wd_host_in.dynamic_schedule and self.wd_host_out.remote:
+            first_id = self.wd_host_in.first_id
+            self.global_ids = list(range(first_id, first_id + self.sample_size))
+            self.last_batch = False
+            # ask the next batch before needing it
+            self.request_batch()
+            nb_thread = max(1, self.wd_host_in.n_cores)
         if not self.wd_host_in.separate_workdir:
             nb_thread = 1
         self.wd_host_out.add_debug('compute on ' + socket.gethostname() + ' in'
                                    ' workdir ' + self.wd_host_in.workdir +
                                    ', using ' + str(nb_thread) + ' threads.')
 
+        if self.wd_host_in.separate_workdir and \
+           self.wd_host_in.launch_mode == 'fork' and self.fork_server is None:
+            self.fork_server = ForkServer(self.wd_host_in,
+                                          self.workers_workdir)
+
+        # the points' workdirs are removed in background
+        self.cleaner = Cleaner(self.wd_host_out)
+        self.cleaner.start()
+
         for i in range(nb_thread):
             thread = ExecInThread(self, i)
             thread.start()
@@ -110,20 +157,330 @@ class CoreDispatcher(object):
         for thread in threads:
             thread.join()
 
+        if not self.keep_workers:
+            self.close_workers()
+        self.cleaner.close()
+
+        if self.global_ids is not None:
+            # the frontal host places the points by their global indices
+            self.wd_host_out.sample = [[global_id, out_point] for
+                                       global_id, out_point in
+                                       zip(self.global_ids,
+                                           self.wd_host_out.sample)]
+
         if self.wd_host_out.remote:
             self.wd_host_out.write_sample()
 
-    def get_next_point(self):
-        """ Private method. Get the next point to compute """
+    def get_next_point(self, nb_points=1):
+        """
+        Private method. Get the next points to compute
+        nb_points: number of consecutive points reserved
+        return the reserved points [begin, end[ (begin == end when every
+        point has been computed)
+        """
 
         self.mutex_next_point.acquire()
+        try:
+            if self.next_point >= self.sample_size:
+                # wait the next batch if any
+                self.receive_batch()
+
+            begin = self.next_point
+            self.next_point = min(self.next_point + nb_points,
+                                  self.sample_size)
+            end = self.next_point
+        finally:
+            self.mutex_next_point.release()
+
+        return begin, end
+
+    def get_global_id(self, point_id):
+        """ Get the indice of the point in the global sample """
+        if self.global_ids is not None:
+            return self.global_ids[point_id]
+        return self.wd_host_in.first_id + point_id
+
+    def request_batch(self):
+        """ Private method. Ask the frontal host for the next batch """
+        self.batch_num += 1
+        self.wd_host_out.add_request(self.batch_num)
+
+    def receive_batch(self):
+        """
+        Private method. Wait for the batch of points requested to the frontal
+        host and append it to the sample (dynamic schedule).
+        return: False if there is no more points to compute
+        """
+        start_time = time.time()
+        while not self.last_batch:
+            batch = wrapper_data.WrapperDataBatch(self.wd_host_in.hostname,
+                                                  self.batch_num)
+            batch.set_dirname(self.wd_host_in.workdir)
+            try:
+                batch.read()
+            except (IOError, EOFError):
+                # not received yet
+                if time.time() - start_time > batch_timeout:
+                    # the points of the batch are not known: no point id
+                    self.wd_host_out.add_error(
+                        None, 'batch ' + str(self.batch_num) +
+                        ' not received after ' + str(batch_timeout) +
+                        ' s: stop computing')
+                    self.errors_appear = True
+                    self.last_batch = True
+                    break
+                time.sleep(self.batch_poll_time)
+                continue
+            os.remove(batch.get_fullname())
+
+            if len(batch.sample) == 0:
+                self.last_batch = True
+                break
+
+            self.wd_host_out.add_debug('received batch ' + str(batch.num) +
+                                       ' of ' + str(len(batch.sample)) +
+                                       ' points')
+            batch_size = len(batch.sample)
+            self.wd_host_in.sample += batch.sample
+            self.wd_host_out.sample += [None] * batch_size
+            self.global_ids += list(range(batch.first_id,
+                                          batch.first_id + batch_size))
+            self.sample_size += batch_size
+            self.request_batch()
+            return True
+
+        return False
+
+    def get_worker(self, thread_id):
+        """ Private method. Get the worker process of a thread """
+        worker = self.workers.get(thread_id)
+        if worker is None or not worker.is_alive():
+            # first point of the thread or previous worker died
+            worker = PoolWorker(self.wd_host_in, self.workers_workdir)
+            self.workers[thread_id] = worker
+        return worker
+
+    def close_workers(self):
+        """ stop every worker process """
+        for worker in self.workers.values():
+            worker.close()
+        self.workers = {}
+
+        if self.fork_server:
+            self.fork_server.close()
+            self.fork_server = None
+
+
+class Cleaner(threading.Thread):
+
+    """
+    remove dirs (or run other cleanup tasks) in background: the compute
+    threads do not wait for it. The failed tasks are retried later.
+    """
+
+    def __init__(self, wd_host_out=None, retry_delay=5, max_try=3):
+        super(Cleaner, self).__init__()
+        self.daemon = True
+        self.wd_host_out = wd_host_out
+        self.retry_delay = retry_delay
+        self.max_try = max_try
+
+        # [time before which the task is not run, nb of tries, func, args]
+        self.tasks = []
+        self.cond = threading.Condition()
+        self.closed = False
+
+    def add(self, func, *args):
+        """ run func(*args) in background """
+        self.cond.acquire()
+        self.tasks.append([0, 0, func, args])
+        self.cond.notify()
+        self.cond.release()
+
+    def remove_dir(self, path):
+        """ remove a dir in background """
+        self.add(remove_dir, path)
+
+    def close(self, wait=True):
+        """ stop once every task is done """
+        self.cond.acquire()
+        self.closed = True
+        self.cond.notify()
+        self.cond.release()
+        if wait:
+            self.join()
+
+    def run(self):
+        while True:
+            self.cond.acquire()
+            while True:
+                now = time.time()
+                ready = [task for task in self.tasks if task[0] <= now]
+                if ready or (self.closed and not self.tasks):
+                    break
+                timeout = None
+                if self.tasks:
+                    timeout = min([task[0] for task in self.tasks]) - now
+                self.cond.wait(timeout)
+            # run every ready task at once
+            for task in ready:
+                self.tasks.remove(task)
+            self.cond.release()
+
+            if not ready:
+                return
+
+            for task in ready:
+                task[1] += 1
+                try:
+                    task[2](*task[3])
+                except:
+                    # NFS cause rmtree raise exception when doing os.rmtree:
+                    # "OSError: [Errno 39] Directory not empty:" ?!
+                    # give it another chance later
+                    if task[1] < self.max_try:
+                        task[0] = time.time() + self.retry_delay
+                        self.cond.acquire()
+                        self.tasks.append(task)
+                        self.cond.release()
+                    else:
+                        ex_info = traceback.format_exc()
+                        err_msg = 'Warning: cleanup failed (' + \
+                            str(task[2]) + str(task[3]) + ') \n(' + \
+                            ex_info.strip() + ')'
+                        if self.wd_host_out is not None:
+                            self.wd_host_out.add_debug(err_msg)
+                        else:
+                            sys.stderr.write(err_msg + '\n')
+
+
+class PoolWorker(object):
+
+    """
+    handle to a long-lived python process that imports the user_wrapper once
+    and computes the points sent through a pipe
+    """
+
+    def __init__(self, wd_host_in, workdir):
+        """ workdir: where the worker is launched """
+        cmd = [sys.executable, workdir + os.sep + pool_worker_script_name]
+        if 'win' not in sys.platform:
+            cmd.append(str(os.getpid()))
+        self.cmd = ' '.join(cmd)
+
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        cwd=workdir)
+        self.send(wd_host_in.user_data)
+
+    def send(self, data):
+        """ send data to the worker """
+        pickle.dump(data, self.process.stdin, pickle.HIGHEST_PROTOCOL)
+        self.process.stdin.flush()
+
+    def is_alive(self):
+        return self.process.poll() is None
 
-        point_idx = self.next_point
-        self.next_point = self.next_point + 1
+    def exec_point(self, workdir, point, is_sample=False):
+        """
+        compute the point in workdir and return the out point
+        is_sample: point is a batch of points, return the out sample
+        """
+        try:
+            self.send([workdir, point, is_sample])
+            out_point, err_msg = pickle.load(self.process.stdout)
+        except (EOFError, IOError):
+            # the wrapper killed the worker (i.e. os._exit, segfault...)
+            raise Exception('worker "' + self.cmd + '" died with status ' +
+                            str(self.process.wait()))
+        if err_msg != '':
+            raise Exception(err_msg)
+        return out_point
+
+    def close(self):
+        """ stop the worker """
+        try:
+            self.send(None)
+            self.process.stdin.close()
+        except IOError:
+            pass
+        self.process.wait()
 
-        self.mutex_next_point.release()
 
-        return point_idx
+class ForkServer(object):
+
+    """
+    handle to a python process that preloads the user_wrapper and forks one
+    child process per point
+    """
+
+    def __init__(self, wd_host_in, workdir):
+        """ workdir: where the server is launched """
+        cmd = [sys.executable, workdir + os.sep + fork_server_script_name,
+               str(os.getpid())]
+        if wd_host_in.preload_modules:
+            cmd.append(','.join(wd_host_in.preload_modules))
+        self.cmd = ' '.join(cmd)
+
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        cwd=workdir)
+
+        # point's workdir -> [event set when finished, exit status]
+        self.points = {}
+        self.mutex = threading.Lock()
+
+        self.reader = threading.Thread(target=self.read_status)
+        self.reader.daemon = True
+        self.reader.start()
+
+    def read_status(self):
+        """ Private method. Get the exit status of the points """
+        for line in iter(self.process.stdout.readline, b''):
+            point_workdir, status = line.decode('utf-8').rstrip('\n').rsplit(' ', 1)
+            self.mutex.acquire()
+            point = self.points.pop(point_workdir)
+            self.mutex.release()
+            point[1] = int(status)
+            point[0].set()
+
+        # the server died: release every waiting thread
+        self.mutex.acquire()
+        for point in self.points.values():
+            point[0].set()
+        self.points = {}
+        self.mutex.release()
+
+    def exec_point(self, workdir):
+        """
+        fork a child that computes the point of workdir.
+        return: the exit status of the child
+        """
+        point = [threading.Event(), None]
+        self.mutex.acquire()
+        try:
+            self.points[workdir] = point
+            self.process.stdin.write((workdir + '\n').encode('utf-8'))
+            self.process.stdin.flush()
+        except IOError:
+            self.points.pop(workdir)
+            point[0].set()
+        self.mutex.release()
+
+        point[0].wait()
+        if point[1] is None:
+            raise Exception('fork server "' + self.cmd + '" died with '
+                            'status ' + str(self.process.wait()))
+        return point[1]
+
+    def close(self):
+        """ stop the server once every child has finished """
+        try:
+            self.process.stdin.close()
+        except IOError:
+            pass
+        self.process.wait()
+        self.reader.join()
 
 
 class ExecInThread(threading.Thread):
@@ -147,72 +504,95 @@ class ExecInThread(threading.Thread):
     def run_separate(self):
         """ run each wrapper in separate workdir """
 
+        batch_size = max(1, self.wd_host_in.batch_size)
         while True:
-            # get next point num (cur_id = point's indice of the received
-            # sample)
-            cur_id = self.dispatcher.get_next_point()
-            if cur_id >= self.dispatcher.sample_size:
+            # get next points [cur_id, end_id[ (indices in the received
+            # sample), computed in the same workdir
+            cur_id, end_id = self.dispatcher.get_next_point(batch_size)
+            if cur_id >= end_id:
                 # write_result(CoreDispatcher.result_debug, None, "thread num " +
                 #             str(self.thread_id) + " stop")
                 break
+            is_batch = end_id - cur_id > 1
 
             # _cur_global_id = point's indice of the global sample
-            cur_global_id = str(self.wd_host_in.first_id + cur_id)
+            cur_global_id = str(self.dispatcher.get_global_id(cur_id))
+            points_name = 'point ' + cur_global_id
+            if is_batch:
+                points_name = 'points ' + cur_global_id + ' to ' + \
+                    str(self.dispatcher.get_global_id(end_id - 1))
 
             start_time = time.time()
-            self.wd_host_out.add_debug('thread num ' + str(self.thread_id) +
-                                       ' start computing point ' +
-                                       cur_global_id)
-
-            in_point = self.wd_host_in.sample[cur_id]
+            if self.wd_host_out.debug:
+                self.wd_host_out.add_debug('thread num ' +
+                                           str(self.thread_id) +
+                                           ' start computing ' + points_name)
 
             # prepare input
             self.create_workdir(cur_global_id)
             wd_core_in = wrapper_data.WrapperDataCoreIn()
             wd_core_in.set_dirname(self.workdir)
-            wd_core_in.point = in_point
+            if is_batch:
+                in_data = self.wd_host_in.sample[cur_id:end_id]
+                wd_core_in.sample = in_data
+            else:
+                in_data = self.wd_host_in.sample[cur_id]
+                wd_core_in.point = in_data
             wd_core_in.user_data = self.wd_host_in.user_data
             wd_core_in.write()
 
             # launch and get the results
             try:
-                self.insulate_command(cur_id)
+                if self.wd_host_in.launch_mode == 'pool':
+                    self.pool_command(cur_id, end_id, in_data)
+                elif self.wd_host_in.launch_mode == 'fork':
+                    self.fork_command(cur_id, end_id)
+                else:
+                    self.insulate_command(cur_id, end_id)
             except:
                 # todo: stop children processes on error?
                 ex_info = traceback.format_exc()
                 compute_time = str(time.time() - start_time)
                 self.wd_host_out.add_error(cur_global_id,
-                                           'ERROR when computing point ' +
-                                           cur_global_id + ' in ' +
+                                           'ERROR when computing ' +
+                                           points_name + ' in ' +
                                            compute_time + ' s \n(' +
                                            ex_info.strip() + ')')
                 self.dispatcher.errors_appear = True
+                if self.wd_host_in.provisioning == 'recycle':
+                    # keep the workdir of the failed point
+                    os.rename(self.workdir, self.wd_host_in.workdir +
+                              os.sep + cur_global_id)
             else:
                 compute_time = str(time.time() - start_time)
-                self.wd_host_out.add_point(cur_global_id,
-                                           in_point,
-                                           'finished computing point ' +
-                                           cur_global_id + ' in ' +
-                                           '{0:.3f}'.format(float(compute_time)) +
-                                           ' s')
+                for point_id in range(cur_id, end_id):
+                    point_global_id = str(
+                        self.dispatcher.get_global_id(point_id))
+                    msg = 'finished computing point ' + point_global_id + \
+                        ' in ' + '{0:.3f}'.format(float(compute_time)) + ' s'
+                    if is_batch:
+                        msg += ' (batch of ' + str(end_id - cur_id) + \
+                            ' points)'
+                    out_point = None
+                    if self.wd_host_in.send_out_points:
+                        out_point = self.wd_host_out.sample[point_id]
+                    self.wd_host_out.add_point(point_global_id,
+                                               self.wd_host_in.sample[point_id],
+                                               msg, out_point)
 
                 # todo: separate function with faster retry
-                if self.wd_host_in.cleanup != 'no':
-                    try:
-                        shutil.rmtree(self.workdir)
-                    except:
-                        # NFS cause rmtree raise exception when doing os.rmtree:
-                        # "OSError: [Errno 39] Directory not empty:" ?!
-                        # give it another chance :
-                        time.sleep(5)
-                        try:
-                            shutil.rmtree(self.workdir)
-                        except:
-                            ex_info = traceback.format_exc()
-                            err_msg = 'Warning: unable to remove dir ' + \
-                                self.workdir + \
-                                ' \n(' + ex_info.strip() + ')'
-                            self.wd_host_out.add_debug(err_msg)
+                if self.wd_host_in.provisioning == 'recycle':
+                    # reused by the next point
+                    pass
+                elif self.wd_host_in.cleanup != 'no':
+                    self.dispatcher.cleaner.remove_dir(self.workdir)
+
+    def remove_recycled_workdir(self):
+        """ remove the workdir of the thread once every point is computed """
+        if self.wd_host_in.provisioning == 'recycle' and \
+           self.wd_host_in.cleanup != 'no' and self.workdir and \
+           os.path.isdir(self.workdir):
+            self.dispatcher.cleaner.remove_dir(self.workdir)
 
     def run_common(self):
         """ run every wrapper in same workdir """
@@ -221,34 +601,127 @@ class ExecInThread(threading.Thread):
         cur_global_id = str(self.wd_host_in.first_id)
         self.wd_host_out.add_debug('start computing sample')
 
-        # user_wrapper string global variable is modified in place and becomes
-        # a module
-        exec(compile('import ' + user_wrapper, '<string>', 'exec'), globals())
-
-        # make the user_data available to the user_wrapper
-        user_wrapper.user_data = self.wd_host_in.user_data
+        import_user_wrapper(self.wd_host_in.user_data)
 
         start_time = time.time()
-        self.wd_host_out.sample = list(
-            map(user_wrapper._exec, self.wd_host_in.sample))
+        while True:
+            # get every point not computed yet (new points are received
+            # later only with a dynamic schedule)
+            cur_id, end_id = self.dispatcher.get_next_point(
+                self.dispatcher.sample_size)
+            if cur_id >= end_id:
+                break
+
+            sample = self.wd_host_in.sample
+            if cur_id > 0 or end_id < len(sample):
+                sample = sample[cur_id:end_id]
+            try:
+                self.common_exec_sample(sample, cur_id)
+            except:
+                # the points are computed at once: none of them is given
+                self.wd_host_out.sample[cur_id:end_id] = \
+                    [None] * (end_id - cur_id)
+                ex_info = traceback.format_exc()
+                compute_time = str(time.time() - start_time)
+                self.wd_host_out.add_error(
+                    str(self.dispatcher.get_global_id(cur_id)),
+                    'ERROR when computing points ' +
+                    str(self.dispatcher.get_global_id(cur_id)) + ' to ' +
+                    str(self.dispatcher.get_global_id(end_id - 1)) + ' in ' +
+                    compute_time + ' s \n(' + ex_info.strip() + ')')
+                self.dispatcher.errors_appear = True
+                continue
+            if self.wd_host_in.send_out_points:
+                for point_id in range(cur_id, end_id):
+                    point_global_id = str(
+                        self.dispatcher.get_global_id(point_id))
+                    self.wd_host_out.add_point(
+                        point_global_id, self.wd_host_in.sample[point_id],
+                        'finished computing point ' + point_global_id,
+                        self.wd_host_out.sample[point_id])
 
         compute_time = str(time.time() - start_time)
         self.wd_host_out.add_debug('finished computing sample in ' +
                                    compute_time + ' s')
 
+    def common_exec_sample(self, sample, cur_id):
+        """
+        compute the sample in the common workdir, its out points are put in
+        the out sample from the indice cur_id
+        """
+        out_sample = self.wd_host_out.sample
+        end_id = cur_id + len(sample)
+        nb_process = 1
+        if self.wd_host_in.multiprocess:
+            nb_process = min(len(sample), max(1, self.wd_host_in.n_cores))
+
+        if nb_process > 1:
+            self.wd_host_out.add_debug('compute sample using ' +
+                                       str(nb_process) + ' processes')
+            out_sample[cur_id:end_id] = self.pool_exec_sample(sample,
+                                                              nb_process)
+        elif hasattr(user_wrapper_module, '_exec_sample'):
+            out_sample[cur_id:end_id] = \
+                wrapper_data.exec_sample(user_wrapper_module, sample)
+        else:
+            # given as soon as computed: the progress of the computation is
+            # seen in the out sample (see SampleFuture.progress)
+            for point_id, in_point in enumerate(sample):
+                out_sample[cur_id + point_id] = \
+                    user_wrapper_module._exec(in_point)
+
+    def pool_exec_sample(self, sample, nb_process):
+        """
+        split the sample into chunks computed by a pool of processes sharing
+        the same workdir.
+        return: the out sample, in the same order as the in sample
+        """
+        import multiprocessing
+
+        # several chunks per process in order to balance the load
+        nb_chunk = min(len(sample), nb_process * 4)
+        chunk_size = int(math.ceil(len(sample) / float(nb_chunk)))
+        chunks = [sample[begin:begin + chunk_size]
+                  for begin in range(0, len(sample), chunk_size)]
+
+        pool = multiprocessing.Pool(nb_process, import_user_wrapper,
+                                    (self.wd_host_in.user_data,
+                                     self.wd_host_in.workdir))
+        try:
+            out_chunks = pool.map(exec_chunk, chunks)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+        return [out_point for out_chunk in out_chunks
+                for out_point in out_chunk]
+
     def run(self):
 
         if self.separate_workdir:
             self.run_separate()
+            self.remove_recycled_workdir()
         else:
             self.run_common()
 
     def create_workdir(self, cur_global_id):
         """ create point's workdir """
 
-        # create point's workdir
         global_workdir = self.wd_host_in.workdir + os.sep
-        self.workdir = global_workdir + cur_global_id
+        provisioning = self.wd_host_in.provisioning
+        if provisioning == 'recycle':
+            # one workdir per thread, reset between points
+            self.workdir = global_workdir + 'thread_' + str(self.thread_id)
+            if os.path.isdir(self.workdir):
+                self.reset_workdir()
+                return
+        else:
+            self.workdir = global_workdir + cur_global_id
+
+        # create point's workdir
         os.makedirs(self.workdir)
 
         # determine user_wrapper if extension is .py or .pyc file
@@ -256,19 +729,83 @@ class ExecInThread(threading.Thread):
         if not os.path.exists(global_workdir + user_wrapper + user_wrapper_ext):
             user_wrapper_ext = ".pyc"
 
-        symlink(global_workdir + user_wrapper + user_wrapper_ext,
-                self.workdir + os.sep + user_wrapper + user_wrapper_ext)
-        symlink(global_workdir + wrapper_data.script_name,
-                self.workdir + os.sep + wrapper_data.script_name)
-        symlink(global_workdir + wrapper_launcher_script_name,
-                self.workdir + os.sep + wrapper_launcher_script_name)
-        symlink(coupling_tools_script_path,
-                self.workdir + os.sep + coupling_tools_script_name)
-
+        # files linked in the workdir: name -> linked file
+        self.workdir_links = {
+            user_wrapper + user_wrapper_ext:
+            global_workdir + user_wrapper + user_wrapper_ext,
+            wrapper_data.script_name:
+            global_workdir + wrapper_data.script_name,
+            wrapper_launcher_script_name:
+            global_workdir + wrapper_launcher_script_name,
+            coupling_tools_script_name: coupling_tools_script_path}
+        for name, linked_file in self.workdir_links.items():
+            symlink(linked_file, self.workdir + os.sep + name)
+
+        # files_to_send restored when the workdir is reset: name -> stat
+        self.workdir_files = {}
         for user_file in self.wd_host_in.files_to_send:
-            shutil.copy(os.path.basename(user_file), self.workdir)
+            name = os.path.basename(user_file)
+            provide_file(global_workdir + name, self.workdir + os.sep + name,
+                         provisioning)
+            self.workdir_files[name] = file_stat(self.workdir + os.sep + name)
+
+    def reset_workdir(self):
+        """
+        remove from the recycled workdir every file created by the previous
+        point, restore the files_to_send it modified and the links it removed
+        """
+        global_workdir = self.wd_host_in.workdir + os.sep
+        for name in os.listdir(self.workdir):
+            path = self.workdir + os.sep + name
+            if name in self.workdir_links:
+                # unchanged
+                continue
+            if name in self.workdir_files and os.path.exists(path) and \
+               self.workdir_files[name] == file_stat(path):
+                # unchanged
+                continue
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        for name, linked_file in self.workdir_links.items():
+            path = self.workdir + os.sep + name
+            if not os.path.lexists(path):
+                symlink(linked_file, path)
+        for name in self.workdir_files:
+            path = self.workdir + os.sep + name
+            if not os.path.lexists(path):
+                provide_file(global_workdir + name, path, 'copy')
+                self.workdir_files[name] = file_stat(path)
+
+    def pool_command(self, cur_id, end_id, in_data):
+        """
+        Compute the point (or the batch of points) in the long-lived worker
+        process of this thread.
+        """
+        worker = self.dispatcher.get_worker(self.thread_id)
+        if self.wd_host_out.debug:
+            self.wd_host_out.add_debug('thread num ' + str(self.thread_id) +
+                                       ' send point to worker ' + worker.cmd)
+        if end_id - cur_id > 1:
+            self.wd_host_out.sample[cur_id:end_id] = \
+                worker.exec_point(self.workdir, in_data, True)
+        else:
+            self.wd_host_out.sample[cur_id] = \
+                worker.exec_point(self.workdir, in_data)
+
+    def fork_command(self, cur_id, end_id):
+        """
+        Compute the point in a child forked from the preloaded fork server.
+        """
+        fork_server = self.dispatcher.fork_server
+        if self.wd_host_out.debug:
+            self.wd_host_out.add_debug('thread num ' + str(self.thread_id) +
+                                       ' fork point from ' + fork_server.cmd)
+        returncode = fork_server.exec_point(self.workdir)
+        self.get_core_out(cur_id, end_id, fork_server.cmd, returncode)
 
-    def insulate_command(self, cur_id):
+    def insulate_command(self, cur_id, end_id):
         """
         Execute the wrapper_launcher in a different processus in order to give
         to the wrapper its own current dir (threads share the same curdir).
@@ -277,13 +814,22 @@ class ExecInThread(threading.Thread):
             wrapper_launcher_script_name
         if 'win' not in sys.platform:
             cmd += " " + str(os.getpid())
-        self.wd_host_out.add_debug('thread num ' + str(self.thread_id) +
-                                   ' start cmd ' + cmd)
+        if self.wd_host_out.debug:
+            self.wd_host_out.add_debug('thread num ' + str(self.thread_id) +
+                                       ' start cmd ' + cmd)
 
         p = subprocess.Popen(cmd.split(), stdout=subprocess.PIPE,
                              stderr=subprocess.PIPE, cwd=self.workdir)
         stdout, stderr = p.communicate()
 
+        self.get_core_out(cur_id, end_id, cmd, p.returncode, stdout, stderr)
+
+    def get_core_out(self, cur_id, end_id, cmd, returncode, stdout='',
+                     stderr=''):
+        """
+        Read the core_out file written by the command.
+        raise an exception if the command failed.
+        """
         # get out point
         # todo: better errmsg if outfile do not exists
         wd_core_out = wrapper_data.WrapperDataCoreOut()
@@ -292,13 +838,16 @@ class ExecInThread(threading.Thread):
         # try to read core file
         try:
             wd_core_out.read()
-            self.wd_host_out.sample[cur_id] = wd_core_out.point
+            if wd_core_out.sample is not None:
+                self.wd_host_out.sample[cur_id:end_id] = wd_core_out.sample
+            else:
+                self.wd_host_out.sample[cur_id] = wd_core_out.point
         except IOError:
             wd_core_out.err_msg = 'cannot read core file'
         
-        if p.returncode != 0:
+        if returncode != 0:
             errmsg = 'command "' + cmd + '" failed with status ' + \
-                str(p.returncode) + ':\n'
+                str(returncode) + ':\n'
             errmsg += '(' + wd_core_out.err_msg + ')\n'
             if stdout.strip() != "":
                 errmsg += '(stdout: ' + str(stdout) + ')\n'
@@ -307,6 +856,121 @@ class ExecInThread(threading.Thread):
             raise Exception(errmsg)
 
 
+def import_user_wrapper(user_data, workdir=None):
+    """
+    import the user_wrapper module (if not already done) and make the
+    user_data available to it.
+    workdir: the workdir containing the user_wrapper, used when the module
+      is imported by a new process
+    """
+    global user_wrapper_module
+    if workdir is not None and workdir not in sys.path:
+        os.chdir(workdir)
+        sys.path.append(workdir)
+
+    if user_wrapper_module is None:
+        user_wrapper_module = __import__(user_wrapper)
+
+    # make the user_data available to the user_wrapper
+    user_wrapper_module.user_data = user_data
+
+
+def exec_chunk(chunk):
+    """ compute a chunk of the sample in a process of the pool """
+    return wrapper_data.exec_sample(user_wrapper_module, chunk)
+
+
+def file_stat(path):
+    """
+    return what tells whether a file (or a dir and its content) has been
+    modified
+    """
+    st = os.stat(path)
+    path_stat = [st.st_size, st.st_mtime, st.st_ino]
+    if os.path.isdir(path) and not os.path.islink(path):
+        for name in sorted(os.listdir(path)):
+            path_stat.append([name, file_stat(path + os.sep + name)])
+    return path_stat
+
+
+def provide_file(src, target, provisioning='copy'):
+    """
+    put the file (or dir) src in a point's workdir:
+    'hardlink': hard link src (the wrapper must not modify it in place),
+    'reflink': copy on write clone of src (btrfs, xfs, ...),
+    copy src otherwise, or if the filesystem does not support it.
+    The files of a dir are provided one by one the same way.
+    """
+    if os.path.isdir(src):
+        os.makedirs(target)
+        for name in os.listdir(src):
+            provide_file(src + os.sep + name, target + os.sep + name,
+                         provisioning)
+        shutil.copystat(src, target)
+        return
+    if provisioning == 'hardlink' and hasattr(os, 'link'):
+        try:
+            os.link(src, target)
+            return
+        except OSError:
+            pass
+    elif provisioning == 'reflink' and sys.platform.startswith('linux'):
+        import fcntl
+        # FICLONE ioctl of linux/fs.h
+        ficlone = 0x40049409
+        src_handle = open(src, 'rb')
+        target_handle = open(target, 'wb')
+        try:
+            fcntl.ioctl(target_handle.fileno(), ficlone, src_handle.fileno())
+            cloned = True
+        except (IOError, OSError):
+            cloned = False
+        finally:
+            src_handle.close()
+            target_handle.close()
+        if cloned:
+            shutil.copymode(src, target)
+            return
+    shutil.copy(src, target)
+
+
+def create_sample_workdir(session_workdir, wd_host_in):
+    """
+    create the workdir of a sample of a session: it links the files sent
+    once in the workdir of the session (the wrapper, the scripts and the
+    files_to_send)
+    """
+    workdir = wd_host_in.workdir
+    names = [wrapper_data.script_name, wrapper_launcher_script_name]
+    names += [os.path.basename(user_file) for user_file in
+              wd_host_in.files_to_send]
+    for name in os.listdir(session_workdir):
+        if name.startswith(user_wrapper + '.'):
+            names.append(name)
+    # the hosts sharing the workdir create it at the same time
+    try:
+        os.makedirs(workdir)
+    except OSError:
+        if not os.path.isdir(workdir):
+            raise
+    for name in names:
+        target = workdir + os.sep + name
+        if os.path.lexists(target) or \
+                not os.path.lexists(session_workdir + os.sep + name):
+            continue
+        try:
+            symlink(session_workdir + os.sep + name, target)
+        except OSError:
+            if not os.path.lexists(target):
+                raise
+
+
+def remove_dir(path):
+    """ remove a dir recursively if it exists """
+    if os.path.lexists(path):
+        shutil.rmtree(path)
+
+
 def symlink(src, target):
     """ symlink file if possible """
     if 'win' in sys.platform:
@@ -28,25 +28,121 @@ import wrapper_data
 
 import os
 import sys
+import socket
+import time
+import pickle
 
 
-if len(sys.argv) == 2:
+# usage: core_dispatcher_launcher.py host_in_file [stream]
+# stream: 'stdout' or 'address:port' of a socket, where the results are sent
+# instead of the host_out file.
+# session (session_timeout of host_in_file): once its sample is computed,
+# the core dispatcher waits for the next one (host_in_<hostname>_<num>.pkl),
+# an empty one ends the session.
+if len(sys.argv) in [2, 3]:
     host_in_file = sys.argv[1]
 else:
     print('host_in_file args required! exit.')
     exit(1)
 
+stream = None
+if len(sys.argv) == 3:
+    if sys.argv[2] == 'stdout':
+        # keep a private handle on stdout: the wrapper (or the programs it
+        # launches) must not write into the stream
+        stream = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+        os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    else:
+        address, port = sys.argv[2].rsplit(':', 1)
+        stream = socket.create_connection((address, int(port))).makefile('wb')
+
 # ensure the core dispatcher will find the in_file
 moduledir = os.path.dirname(os.path.realpath(__file__))
 os.chdir(moduledir)
 
+# the frontal host ends the session before: wait a little longer
+session_margin = 60
+# period (s) of the check of the next sample of a session
+session_poll_time = 0.1
+
+
+def get_host_out(wd_host_in):
+    """ return the object sending the results of the sample """
+    wd_host_out = wrapper_data.WrapperDataHostOut(remote=True)
+    wd_host_out.set_dirname(wd_host_in.workdir)
+    wd_host_out.set_hostname(wd_host_in.hostname)
+    wd_host_out.stream = stream
+    wd_host_out.sample_codec = wd_host_in.sample_codec
+    wd_host_out.debug = wd_host_in.debug
+    return wd_host_out
+
+
+def wait_next_sample(hostname, num, timeout):
+    """
+    wait for the num-th sample of the session
+    return: its WrapperDataHostIn, None if not received before the timeout
+      or if the session has been closed
+    """
+    end_time = time.time() + timeout
+    # the workdir is removed once the session is closed
+    while time.time() < end_time and os.path.isdir(moduledir):
+        wd_host_in = wrapper_data.WrapperDataHostIn(hostname)
+        wd_host_in.set_session_num(num)
+        wd_host_in.set_dirname(moduledir)
+        try:
+            wd_host_in.read()
+        except IOError:
+            # not received yet
+            time.sleep(session_poll_time)
+            continue
+        except (EOFError, IndexError, KeyError, ValueError,
+                pickle.UnpicklingError):
+            # not completely written
+            wd_host_in.close_file()
+            time.sleep(session_poll_time)
+            continue
+        os.remove(wd_host_in.get_fullname())
+        return wd_host_in
+    return None
+
+
 wd_host_in = wrapper_data.WrapperDataHostIn()
 wd_host_in.set_filename(host_in_file)
 wd_host_in.read()
 
-wd_host_out = wrapper_data.WrapperDataHostOut(remote=True)
-wd_host_out.set_dirname(wd_host_in.workdir)
-wd_host_out.set_hostname(wd_host_in.hostname)
+session_timeout = wd_host_in.session_timeout
+if session_timeout:
+    core_dispatcher.create_sample_workdir(moduledir, wd_host_in)
+wd_host_out = get_host_out(wd_host_in)
 
 dispatcher = core_dispatcher.CoreDispatcher(wd_host_in, wd_host_out)
-dispatcher.exec_sample()
+if session_timeout:
+    # the workers import the wrapper once for the whole session
+    dispatcher.workers_workdir = moduledir
+    dispatcher.keep_workers = True
+
+num = 1
+try:
+    while True:
+        try:
+            dispatcher.exec_sample()
+        finally:
+            # the logs still buffered if the sample could not be computed
+            wd_host_out.flush_logs()
+
+        if not session_timeout:
+            break
+        num += 1
+        wd_host_in = wait_next_sample(wd_host_in.hostname, num,
+                                      session_timeout + session_margin)
+        if wd_host_in is None or wd_host_in.sample is None:
+            # idle session or end of the session
+            break
+        core_dispatcher.create_sample_workdir(moduledir, wd_host_in)
+        wd_host_out = get_host_out(wd_host_in)
+        dispatcher.set_sample(wd_host_in, wd_host_out)
+finally:
+    dispatcher.close_workers()
+
+if stream is not None:
+    stream.close()
@@ -37,14 +37,26 @@ import sys
 sys.path.append(ot.__path__[0])
 from otdistfunc import host_dispatcher
 from otdistfunc import wrapper_data
+from otdistfunc import point_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 import traceback
+import hashlib
+import pickle
 import signal
 import os
 import random
 import time
 import threading
 import string
+import copy
+
+# the local computations are done one after the other, see submit_sample
+local_compute_lock = threading.Lock()
 
 
 # __new__ permit to create automatically the NumericalMathFunction
@@ -59,7 +71,10 @@ class DistributedPythonFunction(ot.NumericalMathFunction):
     n_input:
     n_output:      input and output dimension implemented by the function
                    _exec() of the wrapper_file
-    wrapper_file:  a file that must have a function named _exec(point)
+    wrapper_file:  a file that must have a function named _exec(point).
+                   It may also have a function named _exec_sample(points)
+                   that computes several points at once (see
+                   set_batch_size).
 
     hosts:         host on which to send computing. I.e.: 
                    ['node-1', 'node-3', 'node-4']: in this case, every 
@@ -77,7 +92,8 @@ class DistributedPythonFunction(ot.NumericalMathFunction):
                    computation will be launched on localhost.
 
     analytical:    True: each thread share the same workdir, useful only for
-                   analytical formula (n_cores is then set to 1).
+                   analytical formula (n_cores is then set to 1, see
+                   set_multiprocess).
                    False (default): each thread has its own working
                    directory.
 
@@ -194,6 +210,43 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
 
         # stop everything when set to true
         self.stop = False
+        # set by SampleFuture.cancel
+        self.cancelled = False
+        # set once the computation on the current host started: it can no
+        # longer be cancelled
+        self.local_started = False
+        self.cancel_lock = threading.Lock()
+        # during a computation: the host dispatcher, its out data and the
+        # logs shower
+        self.hostdispatcher = None
+        self.wd_hosts_out = None
+        self.show_logs = None
+        # number of points of the sample already known (cache, checkpoint,
+        # duplicates) when the others are dispatched
+        self.n_known = 0
+        # the HostDispatcher kept between the computations, see set_session
+        self.session = None
+        # what the session depends on (files, user_data, hosts...)
+        self.session_key = None
+        # closes the session once idle
+        self.session_timer = None
+        self.session_last_use = None
+        self.session_lock = threading.RLock()
+        # called on each finished point, see set_on_point
+        self.on_point = None
+        # where the computed points are kept, see set_checkpoint
+        self.checkpoint_dir = None
+        # during a computation: the checkpoint of the sample and the
+        # indices of the points dispatched to the hosts
+        self.checkpoint = None
+        self.dispatched_ids = None
+        # compute the identical points of a sample once
+        self.remove_duplicates = False
+        # out points already computed, see set_cache
+        self.cache = None
+        # out points of close points already computed, see
+        # set_tolerance_cache
+        self.tolerance_cache = None
 
     # extanded options ###
 #
@@ -224,6 +277,295 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
         """
         self.wd_hosts_in.separate_workdir = separate_workdir
 
+    def set_multiprocess(self, multiprocess=True):
+        """
+        Only used when each thread share the same workdir (analytical).
+        multiprocess:
+            True: the sample is split into chunks computed by a pool of
+              n_cores processes (on each host), the wrapper_file is imported
+              once per process.
+            False (default): the sample is computed by one process.
+        """
+        self.wd_hosts_in.multiprocess = multiprocess
+
+    def set_launch_mode(self, launch_mode='process', preload_modules=[]):
+        """
+        Only used when each thread has its own working directory.
+        launch_mode:
+            'process' (default): a new python process is launched for each
+              point: the wrapper_file is imported again for every point.
+            'pool': each core keeps one python process alive which imports
+              the wrapper_file once and computes its points one after the
+              other (the wrapper_file global variables are shared between
+              these points).
+            'fork': one python process per host imports the wrapper_file
+              once, then forks a new process for each point (posix only).
+        preload_modules: list of module names imported by the 'fork' process
+            before forking (i.e. ['openturns', 'numpy']).
+        """
+        if launch_mode not in ['process', 'pool', 'fork']:
+            raise Exception("wrong launch_mode parameter (" +
+                            str(launch_mode) + ")!")
+        if launch_mode == 'fork' and not hasattr(os, 'fork'):
+            raise Exception("launch_mode 'fork' is not available on this "
+                            "system!")
+        self.wd_hosts_in.launch_mode = launch_mode
+        self.wd_hosts_in.preload_modules = preload_modules
+
+    def set_provisioning(self, provisioning='copy'):
+        """
+        Only used when each thread has its own working directory.
+        provisioning: how the files_to_send are put in each workdir:
+            'copy' (default): copied for each point,
+            'hardlink': hard linked (fall back to a copy if not possible), the
+                wrapper must not modify them in place,
+            'reflink': copy-on-write clone where the filesystem supports it
+                (btrfs, xfs, ...), a copy otherwise,
+            'recycle': one workdir per thread, reset between points: the
+                files created by a point are removed, the files_to_send it
+                modified are restored. Only the workdirs of failed points are
+                kept (named by the point number).
+        """
+        if provisioning not in ['copy', 'hardlink', 'reflink', 'recycle']:
+            raise Exception("wrong provisioning parameter (" +
+                            str(provisioning) + ")!")
+        self.wd_hosts_in.provisioning = provisioning
+
+    def set_batch_size(self, batch_size=1):
+        """
+        Only used when each thread has its own working directory.
+        batch_size: number of consecutive points given at once to a core.
+            The points of a batch are computed in the same workdir by the
+            _exec_sample(points) function of the wrapper_file if it exists
+            (its _exec function is called on each point otherwise).
+            When each thread share the same workdir, _exec_sample is always
+            called on the whole sample if it exists.
+        """
+        if int(batch_size) < 1:
+            raise Exception("wrong batch_size parameter (" + str(batch_size) +
+                            ")!")
+        self.wd_hosts_in.batch_size = int(batch_size)
+
+    def set_dynamic_schedule(self, dynamic_schedule=True, min_batch_size=1):
+        """
+        Only used when computing on remote hosts.
+        dynamic_schedule: if True, each host receives a first batch of points
+            and asks for a new one as soon as the previous is being computed,
+            instead of a fixed part of the sample. The batches shrink with the
+            remaining points (guided self-scheduling), so fast hosts compute
+            more points and every hosts finish at roughly the same time.
+        min_batch_size: smallest number of points of a batch.
+        """
+        if int(min_batch_size) < 1:
+            raise Exception("wrong min_batch_size parameter (" +
+                            str(min_batch_size) + ")!")
+        self.wd_hosts_in.dynamic_schedule = dynamic_schedule
+        self.wd_hosts_in.min_batch_size = int(min_batch_size)
+
+    def set_max_bootstrap(self, max_bootstrap=8):
+        """
+        Only used when computing on remote hosts.
+        max_bootstrap: maximum number of hosts set up at the same time
+            (connection, files sending and launch of the computation). Each
+            host starts computing as soon as its own setup is finished.
+        """
+        if int(max_bootstrap) < 1:
+            raise Exception("wrong max_bootstrap parameter (" +
+                            str(max_bootstrap) + ")!")
+        self.wd_hosts_in.max_bootstrap = int(max_bootstrap)
+
+    def set_stream_results(self, stream_results=True):
+        """
+        Only used when computing on remote hosts.
+        stream_results: if True, each host sends its logs and results through
+            its ssh connection, kept open during the compute (or through a
+            local socket if the host is the current one), instead of writing
+            them in a file that is checked periodically: results are received
+            as soon as they are available.
+        """
+        self.wd_hosts_in.stream_results = stream_results
+
+    def set_compress_files(self, compress_files=True):
+        """
+        Only used when computing on remote hosts.
+        compress_files: if True, the files sent to each host (files_to_send,
+            wrapper_file, ...) are compressed (gzip). Useful on slow networks.
+        """
+        self.wd_hosts_in.compress_files = compress_files
+
+    def set_remote_cache(self, remote_cache=True):
+        """
+        Only used when computing on remote hosts.
+        remote_cache: if True, the files_to_send and the wrapper_file are kept
+            in a cache directory of each host (remote_tmpdir/otdistfunc_cache)
+            indexed by their content: a file is sent to a host only if it has
+            changed since the previous computations. The workdirs link to the
+            files of the cache: the wrapper must not modify them in place
+            when analytical is True.
+        """
+        self.wd_hosts_in.remote_cache = remote_cache
+
+    def set_session(self, session=True, idle_timeout=600):
+        """
+        Only used when computing on remote hosts.
+        session: if True, the remote workdirs, the connections and the core
+            dispatchers (with their 'pool' or 'fork' processes) are kept
+            from one computation to the next: the files are sent once and
+            each new sample is given to the core dispatchers already running.
+            A new session is started if the wrapper_file, the files_to_send,
+            the user_data, the hosts or the launch_mode change. Call close()
+            to end it. The samples given to submit_sample do not use it.
+        idle_timeout: the session is closed after idle_timeout seconds
+            without computation (the hosts end it by themselves a little
+            later if they are not told).
+        """
+        if idle_timeout <= 0:
+            raise Exception("wrong idle_timeout parameter (" +
+                            str(idle_timeout) + ")!")
+        self.close()
+        if session:
+            self.wd_hosts_in.session_timeout = idle_timeout
+        else:
+            self.wd_hosts_in.session_timeout = 0
+
+    def close(self):
+        """
+        end the session (see set_session): the core dispatchers of the hosts
+        stop and the workdirs are removed in background (see wait_cleanup)
+        """
+        self.session_lock.acquire()
+        try:
+            if self.session_timer is not None:
+                self.session_timer.cancel()
+                self.session_timer = None
+            if self.session is not None:
+                self.session.close_session()
+                self.session = None
+                self.session_key = None
+        finally:
+            self.session_lock.release()
+
+    def set_sample_codec(self, sample_codec='auto'):
+        """
+        sample_codec: how the samples are stored in the files exchanged with
+            the hosts:
+            'auto' (default): 'float64' if the sample only contains floats,
+                'pickle' otherwise,
+            'pickle': python pickle (any python data),
+            'float64': raw doubles stored column by column if every value is
+                a number (an int comes back as a float), 'pickle' otherwise.
+            The user_data is always pickled.
+        """
+        if sample_codec not in wrapper_data.sample_codecs:
+            raise Exception("wrong sample_codec parameter (" +
+                            str(sample_codec) + ")!")
+        self.wd_hosts_in.sample_codec = sample_codec
+
+    def set_on_point(self, on_point=None):
+        """
+        on_point: function called with (global_id, in_point, out_point) as
+            soon as a point is computed, during the computation of the sample
+            (the out points are sent back by the hosts point by point). It is
+            called from a thread of the frontal host, in the order the points
+            finish (the points found in a cache or identical to another point
+            of the sample are not given). None disables it.
+        """
+        if on_point is not None and not callable(on_point):
+            raise Exception("wrong on_point parameter (" + str(on_point) +
+                            ")!")
+        self.on_point = on_point
+
+    def set_checkpoint(self, checkpoint_dir=None):
+        """
+        checkpoint_dir: directory where the computed points are appended as
+            soon as they are received (in checkpoint_<fingerprint>.pkl, the
+            fingerprint depending on the sample, the wrapper_file and the
+            user_data). If the computation of a sample is interrupted, the
+            next computation of the same sample only computes the points
+            that were not received. The file is removed once every point
+            of the sample is computed. None disables it.
+        """
+        if checkpoint_dir is not None:
+            checkpoint_dir = os.path.realpath(checkpoint_dir)
+            if not os.path.isdir(checkpoint_dir):
+                raise Exception("wrong checkpoint_dir parameter (" +
+                                str(checkpoint_dir) + " not found)!")
+        self.checkpoint_dir = checkpoint_dir
+
+    def set_remove_duplicates(self, remove_duplicates=True):
+        """
+        remove_duplicates: if True, the identical points of a sample are
+            computed only once, the others get the same out point. Only for
+            deterministic wrapper_file. Default is False.
+        """
+        self.remove_duplicates = remove_duplicates
+
+    def set_cache(self, cache_file=None, max_points=100000):
+        """
+        cache_file: sqlite database where the computed points are kept,
+            indexed by a hash of the in point, of the wrapper_file content and
+            of the user_data. The points found in it are not computed again.
+            None disables it.
+        max_points: number of points kept, the least recently used points
+            are removed first.
+        """
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        if max_points < 1:
+            raise Exception("wrong max_points parameter (" + str(max_points) +
+                            ")!")
+        if cache_file is not None:
+            self.cache = point_cache.PointCache(cache_file, max_points)
+
+    def set_tolerance_cache(self, cache_file=None, tolerance=1e-12):
+        """
+        Only for deterministic and smooth functions.
+        cache_file: pickle file where the computed points are kept in a k-d
+            tree. A point closer than the tolerance to a computed point is
+            not computed: the out point of the closest one is given. Only the
+            points computed with the same wrapper_file content and user_data
+            are used. None disables it.
+        tolerance: maximum absolute difference on each dimension, a float
+            or a list of n_input floats.
+        """
+        tolerances = tolerance
+        if not isinstance(tolerance, (list, tuple)):
+            tolerances = [tolerance]
+        for tol in tolerances:
+            if not isinstance(tol, (int, float)) or tol < 0:
+                raise Exception("wrong tolerance parameter (" +
+                                str(tolerance) + ")!")
+        if isinstance(tolerance, (list, tuple)) and \
+                len(tolerance) != self.getInputDimension():
+            raise Exception("wrong tolerance parameter (" + str(tolerance) +
+                            "): one float per input expected!")
+        self.tolerance_cache = None
+        if cache_file is not None:
+            self.tolerance_cache = point_cache.ToleranceCache(
+                os.path.realpath(cache_file), tolerance)
+
+    def get_tolerance_cache_stats(self):
+        """
+        return [hits, misses, n_points]: the number of points found and not
+        found in the tolerance cache since set_tolerance_cache, and the number
+        of points it contains
+        """
+        if self.tolerance_cache is None:
+            return [0, 0, 0]
+        return [self.tolerance_cache.hits, self.tolerance_cache.misses,
+                self.tolerance_cache.size()]
+
+    def get_cache_stats(self):
+        """
+        return [hits, misses, n_points]: the number of points found and not
+        found in the cache since set_cache, and the number of points it
+        contains
+        """
+        if self.cache is None:
+            return [0, 0, 0]
+        return [self.cache.hits, self.cache.misses, self.cache.size()]
+
     def add_hosts(self, hosts):
         for host in hosts:
             host_weight = 1
@@ -244,6 +586,38 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
                 ot.Log.Warn("Same host (" + host_name + ") added twice. "
                             "Instance not added twice.")
 
+    def submit_sample(self, in_sample):
+        """
+        compute the sample in background, return a SampleFuture giving its
+        out sample once computed (see SampleFuture).
+        Several samples can be submitted at the same time on the same hosts:
+        each one is computed in its own workdirs. The computations on the
+        current host (neither hosts nor scheduler) are done one after the
+        other since they change the current directory of the process.
+        The options must not be changed while a sample is computed. The caches
+        (set_cache, set_tolerance_cache) are shared by the submitted samples.
+        With set_checkpoint, the same sample must not be submitted twice at
+        the same time: both computations would write the same checkpoint.
+        """
+        task = copy.copy(self)
+        # the computation state is kept by the copy
+        task.wd_hosts_in = copy.copy(self.wd_hosts_in)
+        task.stop = False
+        task.cancelled = False
+        task.local_started = False
+        task.cancel_lock = threading.Lock()
+        task.hostdispatcher = None
+        task.wd_hosts_out = None
+        task.show_logs = None
+        task.n_known = 0
+        task.checkpoint = None
+        task.dispatched_ids = None
+        task.wd_hosts_in.session_timeout = 0
+        task.session = None
+        task.session_timer = None
+        task.session_lock = threading.RLock()
+        return SampleFuture(task, in_sample)
+
     # implement OT needed func ###
 
     def _exec(self, in_point):
@@ -257,19 +631,151 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
         if len(in_sample) == 0:
             return []
 
+        no_point_kept = not self.checkpoint_dir and self.cache is None and \
+            self.tolerance_cache is None
+        if no_point_kept and not self.remove_duplicates:
+            return self.dispatch_sample(in_sample)
+
+        raw_sample = in_sample
+        in_sample = self.convert_to_buffer(in_sample)
+        out_sample = [None] * len(in_sample)
+
+        # indice of the first point identical to each point
+        first_ids = list(range(len(in_sample)))
+        if self.remove_duplicates:
+            points_index = {}
+            if isinstance(in_sample, list):
+                point_key = tuple
+            else:
+                point_key = wrapper_data.to_bytes
+            for point_id in range(len(in_sample)):
+                first_ids[point_id] = points_index.setdefault(
+                    point_key(in_sample[point_id]), point_id)
+        n_duplicates = len([point_id for point_id in range(len(in_sample)) if
+                            first_ids[point_id] != point_id])
+        if no_point_kept and not n_duplicates:
+            # the sample is given as is, like without remove_duplicates
+            return self.dispatch_sample(raw_sample)
+        # the points are identified with the wrapper_file and the user_data
+        context = self.get_fingerprint([])
+
+        cache_keys = None
+        if self.cache is not None:
+            cache_keys = self.cache.get_keys(context, in_sample)
+            cache_points = self.cache.get(cache_keys)
+            out_sample = [cache_points.get(key) for key in cache_keys]
+            if cache_points:
+                ot.Log.Info(str(len(cache_points)) + ' points found in cache ' +
+                            self.cache.filename)
+
+        if self.tolerance_cache is not None:
+            self.tolerance_cache.load(context)
+            missing_ids = [point_id for point_id in range(len(in_sample)) if
+                           out_sample[point_id] is None]
+            close_points = self.tolerance_cache.get(
+                [in_sample[point_id] for point_id in missing_ids])
+            n_found = 0
+            for point_id, out_point in zip(missing_ids, close_points):
+                if out_point is not None:
+                    out_sample[point_id] = out_point
+                    n_found += 1
+            if n_found:
+                ot.Log.Info(str(n_found) + ' points found within the '
+                            'tolerance in cache ' +
+                            self.tolerance_cache.filename)
+
+        checkpoint = None
+        if self.checkpoint_dir:
+            checkpoint = wrapper_data.WrapperDataCheckpoint(
+                self.get_fingerprint(in_sample))
+            checkpoint.set_dirname(self.checkpoint_dir)
+            checkpoint.read()
+            for point_id, out_point in checkpoint.points.items():
+                out_sample[point_id] = out_point
+            if checkpoint.points:
+                ot.Log.Info(str(len(checkpoint.points)) + ' points found in '
+                            'checkpoint ' + checkpoint.get_fullname())
+
+        # the duplicated points are computed once
+        missing_ids = [point_id for point_id in range(len(in_sample)) if
+                       out_sample[point_id] is None and
+                       first_ids[point_id] == point_id]
+        if missing_ids:
+            self.n_known = len(in_sample) - len(missing_ids)
+            self.checkpoint = checkpoint
+            self.dispatched_ids = missing_ids
+            try:
+                missing_sample = in_sample
+                if len(missing_ids) < len(in_sample):
+                    if isinstance(in_sample, list):
+                        missing_sample = [in_sample[point_id] for point_id in
+                                          missing_ids]
+                    else:
+                        missing_sample = in_sample[missing_ids]
+                missing_sample = self.dispatch_sample(missing_sample)
+            finally:
+                self.checkpoint = None
+                self.dispatched_ids = None
+                if checkpoint is not None:
+                    checkpoint.close()
+            for point_id, out_point in zip(missing_ids, missing_sample):
+                out_sample[point_id] = out_point
+        if n_duplicates:
+            for point_id in range(len(in_sample)):
+                if out_sample[point_id] is None:
+                    out_sample[point_id] = out_sample[first_ids[point_id]]
+            ot.Log.Info('sample of ' + str(len(in_sample)) + ' points: ' +
+                        str(n_duplicates) + ' duplicated points not computed')
+
+        if self.cache is not None:
+            self.cache.put(dict([[cache_keys[point_id], out_sample[point_id]]
+                                 for point_id in missing_ids if
+                                 out_sample[point_id] is not None]))
+        if self.tolerance_cache is not None:
+            self.tolerance_cache.put([[in_sample[point_id],
+                                       out_sample[point_id]] for point_id in
+                                      missing_ids if
+                                      out_sample[point_id] is not None])
+        if checkpoint is not None and \
+                all(out_point is not None for out_point in out_sample):
+            checkpoint.remove()
+        return out_sample
+
+    def dispatch_sample(self, in_sample):
+        """
+        private function
+
+        compute the sample on the hosts
+        """
         start_time = time.time()
         self.set_workdir_basename()
 
         remote_compute = self.wd_hosts_in.scheduler or self.wd_hosts_in.hosts
         if remote_compute:
             self.redirect_signal()
-
+        else:
+            # the local computations change the current dir of the process:
+            # the submitted ones are done one after the other
+            local_compute_lock.acquire()
+            self.cancel_lock.acquire()
+            self.local_started = True
+            self.cancel_lock.release()
+
+        hostdispatcher = None
         try:
-            curdir_bkp = os.getcwd()
-
+            if self.cancelled:
+                raise Exception('computation cancelled!')
+            curdir_bkp = None
+            if not remote_compute:
+                curdir_bkp = os.getcwd()
 
             # set in sample
-            if self.wd_hosts_in.separate_workdir == False and not remote_compute:
+            if remote_compute:
+                # the sample sent to each host is a view of a single buffer
+                self.wd_hosts_in.sample = self.convert_to_buffer(in_sample)
+            elif self.wd_hosts_in.separate_workdir == False and \
+                    not self.wd_hosts_in.multiprocess and \
+                    not wrapper_data.is_float64_array(in_sample):
                 # do not convert when local and no separate_workdir compute
                 self.wd_hosts_in.sample = in_sample
             else:
@@ -280,18 +786,28 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
             wd_hosts_out = wrapper_data.WrapperDataHostsOut()
             wd_hosts_out.hostname
             self.wd_hosts_out = wd_hosts_out
-
-            self.show_logs = ShowLogs(wd_hosts_out, slow_update=remote_compute)
+            # the debug logs are not even recorded if they would not be shown
+            self.wd_hosts_in.debug = (ot.Log.Flags() & ot.Log.DBG) != 0
+            wd_hosts_out.debug = self.wd_hosts_in.debug
+
+            on_point = None
+            if self.on_point is not None or self.checkpoint is not None:
+                on_point = self.point_finished
+            self.wd_hosts_in.send_out_points = on_point is not None
+            self.show_logs = ShowLogs(wd_hosts_out, slow_update=remote_compute,
+                                      on_point=on_point)
             self.show_logs.start()
 
             # launch compute
-            hostdispatcher = host_dispatcher.HostDispatcher(
-                self.wd_hosts_in, wd_hosts_out)
+            hostdispatcher = self.get_host_dispatcher(wd_hosts_out)
             self.hostdispatcher = hostdispatcher
+            if self.cancelled:
+                raise Exception('computation cancelled!')
             hostdispatcher.exec_sample()
 
             # restore previous dir
-            os.chdir(curdir_bkp)
+            if curdir_bkp is not None:
+                os.chdir(curdir_bkp)
 
         except Exception as e:
             ex_info = traceback.format_exc()
@@ -300,12 +816,18 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
                 #e.errno, e.strerror
                 self.restore_signal()
                 self.stop_now()
-            self.show_logs.show = False
+            if self.show_logs is not None:
+                self.show_logs.stop()
             raise e
+        finally:
+            if not remote_compute:
+                local_compute_lock.release()
+            if hostdispatcher is not None and hostdispatcher is self.session:
+                self.release_session()
         if remote_compute:
             self.restore_signal()
 
-        self.show_logs.show = False
+        self.show_logs.stop()
         self.show_logs.join()
 
         compute_time = str(time.time() - start_time)
@@ -314,6 +836,100 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
 
         return wd_hosts_out.sample
 
+    def get_host_dispatcher(self, wd_hosts_out):
+        """
+        private function
+
+        return the HostDispatcher of the session (see set_session), held
+        until release_session, or a new one if there is no session
+        """
+        if not self.wd_hosts_in.session_timeout or \
+                not (self.wd_hosts_in.scheduler or self.wd_hosts_in.hosts):
+            return host_dispatcher.HostDispatcher(self.wd_hosts_in,
+                                                  wd_hosts_out)
+        self.session_lock.acquire()
+        try:
+            if self.session_timer is not None:
+                self.session_timer.cancel()
+                self.session_timer = None
+            session_key = self.get_session_key()
+            if self.session is not None and \
+                    (not self.session.session_started or
+                     self.session.session_broken or
+                     self.session_key != session_key):
+                self.close()
+            if self.session is None:
+                self.session = host_dispatcher.HostDispatcher(
+                    self.wd_hosts_in, wd_hosts_out)
+                self.session_key = session_key
+            else:
+                ot.Log.Info('sample given to the running session')
+            self.session.wd_hosts_in = self.wd_hosts_in
+            self.session.wd_hosts_out = wd_hosts_out
+        except:
+            self.session_lock.release()
+            raise
+        return self.session
+
+    def release_session(self):
+        """
+        private function
+
+        the session waits for the next sample (closed if it can not compute
+        it or once idle)
+        """
+        try:
+            if self.session.session_broken:
+                self.close()
+            else:
+                self.session_last_use = time.time()
+                self.session_timer = threading.Timer(
+                    self.wd_hosts_in.session_timeout, self.close_idle_session)
+                self.session_timer.daemon = True
+                self.session_timer.start()
+        finally:
+            self.session_lock.release()
+
+    def close_idle_session(self):
+        """ private function: called by the session_timer """
+        self.session_lock.acquire()
+        try:
+            if self.session is not None and self.session_last_use is not \
+                    None and time.time() - self.session_last_use >= \
+                    self.wd_hosts_in.session_timeout:
+                ot.Log.Info('close the idle session')
+                self.close()
+        finally:
+            self.session_lock.release()
+
+    def get_session_key(self):
+        """
+        private function
+
+        return a hash of what the running core dispatchers of the session
+        depend on
+        """
+        wd_hosts_in = self.wd_hosts_in
+        files_hash = [host_dispatcher.get_file_hash(local_file) for
+                      local_file in [wd_hosts_in.wrapper_file] +
+                      list(wd_hosts_in.files_to_send)]
+        sha = hashlib.sha1()
+        # the hosts of a scheduler are only known once the computation
+        # starts
+        sha.update(pickle.dumps([files_hash, wd_hosts_in.user_data,
+                                 wd_hosts_in.scheduler or wd_hosts_in.hosts,
+                                 wd_hosts_in.launch_mode,
+                                 wd_hosts_in.preload_modules,
+                                 wd_hosts_in.stream_results], 2))
+        return sha.hexdigest()
+
+    def wait_cleanup(self):
+        """
+        The workdirs are removed in background once the results are given:
+        wait until they are removed.
+        """
+        host_dispatcher.wait_cleanup()
+
     # internal function ###
     def set_workdir_basename(self):
         """ get a workdir name that will be uniq for one compute """
@@ -335,6 +951,35 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
             uuid = uuid + str(r)
         return uuid
 
+    def get_fingerprint(self, sample):
+        """
+        private function
+
+        return a hash of the sample, the wrapper_file and the user_data
+        """
+        sha = hashlib.sha1()
+        sha.update(host_dispatcher.get_file_hash(
+            self.wd_hosts_in.wrapper_file).encode('utf-8'))
+        if wrapper_data.is_float64_array(sample):
+            sha.update(str(list(sample.shape)).encode('utf-8'))
+            sha.update(wrapper_data.to_bytes(sample))
+            sample = None
+        sha.update(pickle.dumps([sample, self.wd_hosts_in.user_data], 2))
+        return sha.hexdigest()
+
+    def point_finished(self, global_id, in_point, out_point):
+        """
+        private function
+
+        called by ShowLogs on each finished point
+        """
+        if self.dispatched_ids is not None:
+            global_id = self.dispatched_ids[global_id]
+        if self.checkpoint is not None:
+            self.checkpoint.add_point(global_id, out_point)
+        if self.on_point is not None:
+            self.on_point(global_id, in_point, out_point)
+
     def convert_to_list_of_list(self, in_sample):
         """
         private function
@@ -342,17 +987,43 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
         convert data to pure python in order to be able to manipulate them
         without any OT dependances
         """
-        return [[s for s in p] for p in in_sample]
+        sample = self.convert_to_buffer(in_sample)
+        if wrapper_data.is_float64_array(sample):
+            return sample.tolist()
+        return sample
+
+    def convert_to_buffer(self, in_sample):
+        """
+        private function
+
+        convert data to a contiguous 2d numpy array of doubles, converted only
+        once and sliced without copy (a list of lists if numpy is not
+        available or if the points are not numbers)
+        """
+        if numpy is None:
+            return [[s for s in p] for p in in_sample]
+        try:
+            sample = numpy.ascontiguousarray(in_sample, dtype=numpy.float64)
+        except (TypeError, ValueError):
+            sample = None
+        if sample is None or sample.ndim != 2:
+            return [[s for s in p] for p in in_sample]
+        return sample
 
     def redirect_signal(self):
         """
         private function
         """
+        self.signal_redirected = False
+        if not isinstance(threading.current_thread(), threading._MainThread):
+            # a submitted computation: stopped by SampleFuture.cancel
+            return
         try:
             # ! When threads are enabled, this function can only be called from
             # the main thread
             self._prev_handler = signal.signal(signal.SIGINT,
                                                self.sigint_handler)
+            self.signal_redirected = True
         except:
             ot.Log.Warn("Failed to setup sigint interrupt handler. Remote "
                         "compute will not been properly stopped when CTRL-C is "
@@ -362,6 +1033,8 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
         """
         private function
         """
+        if not self.signal_redirected:
+            return
         try:
             signal.signal(signal.SIGINT, self._prev_handler)
         except:
@@ -385,8 +1058,10 @@ class OpenTURNSDistributedPythonFunction(ot.OpenTURNSPythonFunction):
             self.stop = True
 
             ot.Log.Error('Start stopping children.')
-            self.hostdispatcher.stop_now()
-            self.show_logs.show = False
+            if self.hostdispatcher is not None:
+                self.hostdispatcher.stop_now()
+            if self.show_logs is not None:
+                self.show_logs.stop()
             ot.Log.Error('Children stopped.')
 
 
@@ -394,12 +1069,18 @@ class ShowLogs(threading.Thread):
 
     """ a thread that show logs """
 
-    def __init__(self, wd_hosts_out, slow_update=False):
+    def __init__(self, wd_hosts_out, slow_update=False, on_point=None):
 
         super(ShowLogs, self).__init__()
         self.wd_hosts_out = wd_hosts_out
+        # called with (global_id, in_point, out_point) on each finished point
+        self.on_point = on_point
 
         self.show = True
+        # wakes the thread up once show is False (see stop)
+        self.wakeup = threading.Event()
+        # number of finished points
+        self.n_points = 0
 
         if slow_update:
             self.cur_sleep = 1
@@ -431,6 +1112,9 @@ class ShowLogs(threading.Thread):
                     # ot.Log.Info(time_str + ' - Point ' + str(data[0]) + ' finished in ' +
                     #            data[1] + 's')
                     ot.Log.Info(time_str + ' - ' + data[2])
+                    self.n_points += 1
+                    if self.on_point is not None and len(data) > 3:
+                        self.call_on_point(data)
 
                 log = hosts_out.get_next_log()
 
@@ -438,10 +1122,116 @@ class ShowLogs(threading.Thread):
             if not self.show:
                 break
 
-            time.sleep(self.cur_sleep)
+            self.wakeup.wait(self.cur_sleep)
             if self.cur_sleep < self.max_sleep:
                 self.cur_sleep += 0.2
 
+    def stop(self):
+        """ show the remaining logs, then stop the thread """
+        self.show = False
+        self.wakeup.set()
+
+    def call_on_point(self, data):
+        """ give a finished point to the on_point function """
+        try:
+            self.on_point(int(data[0]), data[1], data[3])
+        except:
+            ot.Log.Warn('failed to handle the finished point ' +
+                        str(data[0]) + ' (' + traceback.format_exc().strip() +
+                        ')')
+
+
+class SampleFuture(object):
+
+    """
+    the computation of a sample in background, see
+    OpenTURNSDistributedPythonFunction.submit_sample
+    """
+
+    def __init__(self, function, in_sample):
+        # the copy of the function computing the sample
+        self.function = function
+        self.n_points = len(in_sample)
+        self.out_sample = None
+        self.exception = None
+        self.finished = threading.Event()
+
+        self.thread = threading.Thread(target=self.run, args=(in_sample,))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self, in_sample):
+        """ private function """
+        try:
+            self.out_sample = self.function._exec_sample(in_sample)
+        except Exception as exc:
+            self.exception = exc
+        self.finished.set()
+
+    def done(self):
+        """ return True once the computation is finished (or cancelled) """
+        return self.finished.is_set()
+
+    def cancelled(self):
+        return self.function.cancelled
+
+    def cancel(self):
+        """
+        stop the computation, return False if it was already finished.
+        A computation on the current host can only be cancelled before it
+        starts: False is returned once it started.
+        """
+        if self.done():
+            return False
+        function = self.function
+        function.cancel_lock.acquire()
+        try:
+            if function.local_started:
+                return False
+            function.cancelled = True
+        finally:
+            function.cancel_lock.release()
+        function.stop_now()
+        return True
+
+    def progress(self):
+        """
+        return [n_finished, n_points]: the number of points of the sample
+        already computed (or found in a cache) and its number of points
+        """
+        if self.done():
+            return [self.n_points, self.n_points]
+        function = self.function
+        n_finished = function.n_known
+        if function.local_started:
+            # the points computed in a common workdir are not logged: count
+            # the out points already given
+            wd_hosts_out = function.wd_hosts_out
+            if wd_hosts_out is not None and wd_hosts_out.sample:
+                n_finished += len([out_point for out_point in
+                                   wd_hosts_out.sample
+                                   if out_point is not None])
+        elif function.show_logs is not None:
+            n_finished += function.show_logs.n_points
+        return [min(n_finished, self.n_points), self.n_points]
+
+    def result(self, timeout=None):
+        """
+        wait for the computation, return the out sample.
+        timeout: maximum waiting time in seconds (None: no limit), an
+            exception is raised if the computation is not finished.
+        Raise the exception of the computation if it failed.
+        """
+        self.finished.wait(timeout)
+        if not self.finished.is_set():
+            raise Exception('computation not finished after ' +
+                                str(timeout) + ' s.!')
+        if self.function.cancelled:
+            raise Exception('computation cancelled!')
+        if self.exception is not None:
+            raise self.exception
+        return self.out_sample
+
 
 """
 ====================================
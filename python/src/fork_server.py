@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+#                                               -*- Python -*-
+#
+# @file  fork_server.py
+# @brief Preload the wrapper and fork one child process per point.
+#
+# Copyright (C) 2005-2013 EDF-EADS-Phimeca
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# along with this library.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @author souchaud
+# @date   2012-08-28
+#
+
+"""
+Preload the wrapper and fork one child process per point (posix only).
+
+usage: fork_server.py parent_pid [module1,module2,...]
+
+Protocol (one line per message on stdin/stdout):
+  - request: the point's workdir (containing the core_in file),
+  - answer: the point's workdir followed by the exit status of the child.
+The child behaves like wrapper_launcher.py: it reads the core_in file and
+writes the core_out file in the point's workdir.
+The server stops once stdin is closed and every child has finished.
+"""
+
+import traceback
+import select
+import signal
+import fcntl
+import sys
+import os
+import time
+import threading
+
+# keep private handles on the pipes: the wrapper (or the programs it
+# launches) must not write into the protocol stream
+proto_in = os.dup(sys.stdin.fileno())
+proto_out = os.dup(sys.stdout.fileno())
+devnull = os.open(os.devnull, os.O_RDONLY)
+os.dup2(devnull, sys.stdin.fileno())
+os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+# ensure the global workdir is searched for wrapper_data and user_wrapper
+global_workdir = os.getcwd()
+sys.path.append(global_workdir)
+
+import wrapper_data
+import coupling_tools
+
+
+def check_parent(parent_pid):
+    """ stop current process (and it's children) if parent dies """
+    while True:
+        if os.getppid() != parent_pid:
+            # kill children's too
+            os.system('kill -- -' + str(os.getpgid(0)))
+            os._exit(1)
+        time.sleep(1)
+
+parent_pid = 0
+if len(sys.argv) >= 2:
+    parent_pid = int(sys.argv[1])
+# parent_pid == 0: do not launch it on localhost cause it will kill the
+# initial python script!
+if parent_pid:
+    parent_checker = threading.Thread(target=check_parent,
+                                      args=(parent_pid,))
+    parent_checker.daemon = True
+    parent_checker.start()
+
+# preload every module needed by the wrapper
+import_err_msg = ''
+try:
+    import user_wrapper
+except:
+    import_err_msg = "ERROR during wrapper import:\n" + \
+        traceback.format_exc()
+
+if len(sys.argv) >= 3:
+    for module_name in sys.argv[2].split(','):
+        try:
+            __import__(module_name)
+        except:
+            sys.stderr.write('fork_server: unable to preload module ' +
+                             module_name + '\n' + traceback.format_exc())
+
+
+def exec_point():
+    """ compute the point of the current dir, return the exit status """
+    wd_core_out = wrapper_data.WrapperDataCoreOut()
+    try:
+        if import_err_msg:
+            raise Exception(import_err_msg)
+        wd_core_in = wrapper_data.WrapperDataCoreIn()
+        wd_core_in.read()
+        user_wrapper.user_data = wd_core_in.user_data
+        if wd_core_in.sample is not None:
+            wd_core_out.sample = wrapper_data.exec_sample(user_wrapper,
+                                                          wd_core_in.sample)
+        else:
+            wd_core_out.point = user_wrapper._exec(wd_core_in.point)
+    except:
+        wd_core_out.err_msg = "ERROR during wrapper execution:\n" + \
+            traceback.format_exc()
+
+    try:
+        wd_core_out.write()
+    except:
+        traceback.print_exc()
+        return 2
+
+    if wd_core_out.err_msg != '':
+        print(wd_core_out.err_msg)
+        return 1
+    return 0
+
+
+# wake the main loop up as soon as a child finishes
+wakeup_in, wakeup_out = os.pipe()
+for fd in [wakeup_in, wakeup_out]:
+    fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) |
+                os.O_NONBLOCK)
+signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+signal.set_wakeup_fd(wakeup_out)
+
+
+def fork_point(point_workdir):
+    """ fork a child that computes the point of point_workdir """
+    pid = os.fork()
+    if pid == 0:
+        # child
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for fd in [proto_in, proto_out, wakeup_in, wakeup_out]:
+            os.close(fd)
+        status = 2
+        try:
+            os.chdir(point_workdir)
+            status = exec_point()
+        except:
+            traceback.print_exc()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+    return pid
+
+
+def send_status(point_workdir, status):
+    """ send the exit status of a point to the core dispatcher """
+    msg = point_workdir + ' ' + str(status) + '\n'
+    os.write(proto_out, msg.encode('utf-8'))
+
+
+# pid -> point's workdir
+children = {}
+buf = b''
+stdin_open = True
+while stdin_open or children:
+    # wait for new points or finished children
+    fds = [wakeup_in]
+    if stdin_open:
+        fds.append(proto_in)
+    try:
+        ready = select.select(fds, [], [], 1)[0]
+    except select.error:
+        # interrupted by SIGCHLD
+        ready = []
+
+    if wakeup_in in ready:
+        os.read(wakeup_in, 4096)
+
+    if proto_in in ready:
+        data = os.read(proto_in, 65536)
+        if not data:
+            stdin_open = False
+        buf += data
+        while b'\n' in buf:
+            line, buf = buf.split(b'\n', 1)
+            point_workdir = line.decode('utf-8')
+            children[fork_point(point_workdir)] = point_workdir
+
+    # reap finished children
+    while children:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+        if pid == 0:
+            break
+        if os.WIFSIGNALED(status):
+            status = -os.WTERMSIG(status)
+        else:
+            status = os.WEXITSTATUS(status)
+        send_status(children.pop(pid), status)
@@ -38,11 +38,126 @@ import shutil
 import socket
 import math
 import tempfile
+import threading
+import hashlib
+import atexit
 
 # todo: permit to have several compute type.
 
 script_name = 'host_dispatcher.py'
 core_dispatcher_launcher = "core_dispatcher_launcher.py"
+# dir of remote_tmpdir where the user files are kept between computations
+remote_cache_dir = "otdistfunc_cache"
+# path: [[size, mtime, mode], sha1 of the content]
+files_hash_cache = {}
+# background cleanup of the workdirs (see get_cleaner)
+cleaner = None
+cleaner_lock = threading.Lock()
+
+
+def get_cleaner():
+    """
+    return the thread that cleans the workdirs in background once the
+    results are given
+    """
+    global cleaner
+    cleaner_lock.acquire()
+    if cleaner is None:
+        cleaner = core_dispatcher.Cleaner()
+        cleaner.start()
+    cleaner_lock.release()
+    return cleaner
+
+
+def wait_cleanup():
+    """ wait for the end of the cleanup of the previous computations """
+    global cleaner
+    cleaner_lock.acquire()
+    if cleaner is not None:
+        cleaner.close()
+        cleaner = None
+    cleaner_lock.release()
+
+# do not let the interpreter exit before the end of the cleanup
+atexit.register(wait_cleanup)
+
+
+def get_file_hash(path):
+    """
+    return the sha1 of the content of a file (or of a dir recursively).
+    The hash of a file is kept while its size and mtime do not change.
+    """
+    path = os.path.realpath(path)
+    if os.path.isdir(path):
+        sha = hashlib.sha1()
+        for name in sorted(os.listdir(path)):
+            sha.update((name + ' ' + get_file_hash(path + os.sep + name) +
+                        '\n').encode('utf-8'))
+        return sha.hexdigest()
+
+    file_stat = os.stat(path)
+    key = [file_stat.st_size, file_stat.st_mtime, file_stat.st_mode]
+    if path in files_hash_cache and files_hash_cache[path][0] == key:
+        return files_hash_cache[path][1]
+
+    sha = hashlib.sha1()
+    handle = open(path, 'rb')
+    try:
+        data = handle.read(1 << 20)
+        while data:
+            sha.update(data)
+            data = handle.read(1 << 20)
+    finally:
+        handle.close()
+    # the mode is kept by the cache: different modes, different entries
+    sha.update(str(file_stat.st_mode).encode('utf-8'))
+    file_hash = sha.hexdigest()
+    files_hash_cache[path] = [key, file_hash]
+    return file_hash
+
+
+def is_localhost(hostname):
+    """ return True if hostname is the current host """
+    local = False
+    try:
+        local = socket.getfqdn(hostname) == socket.getfqdn() or \
+            socket.gethostbyname(hostname) == "127.0.0.1" or \
+            socket.gethostname() == hostname
+    except:
+        local = False
+    return local
+
+
+class GuidedScheduler(object):
+
+    """
+    guided self-scheduling of the points of a sample: each batch given to a
+    host is proportional to the remaining points, so the first batches are
+    big (low overhead) and the last ones small (hosts finish together).
+    """
+
+    def __init__(self, sample_size, total_weight, min_batch_size=1):
+        self.sample_size = sample_size
+        self.total_weight = total_weight
+        self.min_batch_size = max(1, min_batch_size)
+        self.next_id = 0
+        # hosts are monitored by several threads
+        self.mutex = threading.Lock()
+
+    def next_batch(self, host_weight=1):
+        """
+        return the [begin, end[ ids of the next batch of points of a host
+        (begin == end once every point has been given)
+        """
+        self.mutex.acquire()
+        remaining = self.sample_size - self.next_id
+        size = int(math.ceil(remaining * host_weight /
+                             (2.0 * self.total_weight)))
+        size = min(max(size, self.min_batch_size), remaining)
+        begin = self.next_id
+        self.next_id += size
+        self.mutex.release()
+        return [begin, begin + size]
 
 
 class HostDispatcher(object):
@@ -72,6 +187,27 @@ class HostDispatcher(object):
 
         # contain handle to hosts connection
         self.hosts_channel = {}
+        # stream of the results of each host (stream mode)
+        self.hosts_stream = {}
+        # hosts sharing the workdir with the current host
+        self.hosts_shared = set()
+        # [probe file, its content] (see create_probe)
+        self.probe = None
+
+        # session (see WrapperDataHostIn.session_timeout): the hosts keep
+        # their workdir and their core dispatcher between the samples, the
+        # same HostDispatcher computes each sample
+        self.session_started = False
+        # the session can not compute other samples (stopped, host lost)
+        self.session_broken = False
+        # errors appeared during the session: its workdir is kept
+        self.session_errors = False
+        # number of samples computed during the session
+        self.n_samples = 0
+        # number of samples given to each host during the session
+        self.hosts_sample_num = {}
+        # workdir of the current sample (a dir of the session workdir)
+        self.sample_workdir = None
 
     def get_scheduler_hosts(self):
         """
@@ -161,13 +297,8 @@ class HostDispatcher(object):
 
         if self.wd_hosts_in.cleanup == "all" or \
            (not coredispatcher.errors_appear and self.wd_hosts_in.cleanup == "ok"):
-            try:
-                shutil.rmtree(self.wd_hosts_in.workdir)
-            except:
-                ex_info = traceback.format_exc()
-                self.wd_hosts_out.add_error("unable to remove dir " +
-                                            self.wd_hosts_in.workdir + "\n(" +
-                                            ex_info.strip() + ")", "warn")
+            # in background, see wait_cleanup
+            get_cleaner().remove_dir(self.wd_hosts_in.workdir)
 
     def create_workdir(self):
         """ create host workdir """
@@ -196,6 +327,16 @@ class HostDispatcher(object):
                                     core_dispatcher.wrapper_launcher_script_name,
                                     workdir + os.sep +
                                     core_dispatcher.wrapper_launcher_script_name)
+            if self.wd_hosts_in.launch_mode == 'pool':
+                core_dispatcher.symlink(self.moduledir + os.sep +
+                                        core_dispatcher.pool_worker_script_name,
+                                        workdir + os.sep +
+                                        core_dispatcher.pool_worker_script_name)
+            elif self.wd_hosts_in.launch_mode == 'fork':
+                core_dispatcher.symlink(self.moduledir + os.sep +
+                                        core_dispatcher.fork_server_script_name,
+                                        workdir + os.sep +
+                                        core_dispatcher.fork_server_script_name)
         for f in self.wd_hosts_in.files_to_send:
             shutil.copy(f, workdir)
 
@@ -219,245 +360,155 @@ class HostDispatcher(object):
         remainder = sample_size % total_weight
         begin = 0
 
-        # same workdir name for every hosts
-        if not self.wd_hosts_in.remote_tmpdir:
-            self.wd_hosts_in.remote_tmpdir = tempfile.gettempdir()
-        hosts_workdir = self.wd_hosts_in.remote_tmpdir + os.sep
-        hosts_workdir += self.wd_hosts_in.workdir_basename
-        self.hosts_workdir = hosts_workdir
-
-        # todo: cleanup local workdir
-        # create workdir localy even if not used in order to know if ther is nfs
-        # os.makedirs(local_workdir)
+        scheduler = None
+        if self.wd_hosts_in.dynamic_schedule:
+            scheduler = GuidedScheduler(sample_size, total_weight,
+                                        self.wd_hosts_in.min_batch_size)
+
+        session = self.wd_hosts_in.session_timeout > 0
+        if not self.session_started:
+            # same workdir name for every hosts
+            if not self.wd_hosts_in.remote_tmpdir:
+                self.wd_hosts_in.remote_tmpdir = tempfile.gettempdir()
+            self.hosts_workdir = self.wd_hosts_in.remote_tmpdir + os.sep + \
+                self.wd_hosts_in.workdir_basename
+
+            # guess NFS: write a probe file in the workdir created localy,
+            # the hosts seeing it share the workdir with the current host
+            self.create_probe()
+
+            # contain handle to hosts connection
+            self.hosts_channel = {}
+            # stream of the results of each host (stream mode)
+            self.hosts_stream = {}
+        hosts_workdir = self.hosts_workdir
+        self.sample_workdir = hosts_workdir
+        if session:
+            # each sample of the session has its own dir
+            self.n_samples += 1
+            self.sample_workdir = hosts_workdir + os.sep + 'sample_' + \
+                str(self.n_samples)
+
+        # content hash of the user files kept in the hosts cache
+        self.files_hash = {}
+        if self.wd_hosts_in.remote_cache:
+            for local_file in self.wd_hosts_in.files_to_send + \
+                    [self.wd_hosts_in.wrapper_file]:
+                self.files_hash[local_file] = get_file_hash(local_file)
 
         # copy files_to_send list
         files_to_send = [f for f in self.wd_hosts_in.files_to_send]
         module_dir = self.moduledir + os.sep
         files_to_send.append(module_dir + core_dispatcher.script_name)
         files_to_send.append(module_dir + wrapper_data.script_name)
-        files_to_send.append(module_dir + core_dispatcher.script_name)
         files_to_send.append(
             module_dir + core_dispatcher.wrapper_launcher_script_name)
+        files_to_send.append(
+            module_dir + core_dispatcher.pool_worker_script_name)
+        files_to_send.append(
+            module_dir + core_dispatcher.fork_server_script_name)
         files_to_send.append(core_dispatcher.coupling_tools_script_path)
         files_to_send.append(module_dir + core_dispatcher_launcher)
 
         # an error appears
         errors_appear = False
 
-        # contain handle to hosts connection
-        self.hosts_channel = {}
         # host sample id boundary
-        hosts_ids = {}
-        # contain whether the host has shared filesystem
-        #hosts_nfs = {}
-        #cur_nfs_share = 0
-        host_num = 0
+        hosts_ids = []
         for host, host_weight in hosts:
-            # stop command received
-            if self.stop:
-                hosts_out.add_debug('stopped while launching compute')
-                errors_appear = True
-                break
-
-            end = begin + chunk * host_weight
-            if remainder > 0:
-                end = end + host_weight
-                if end > sample_size:
-                    end = sample_size
-                remainder -= host_weight
-            hosts_ids[host] = [begin, end]
+            if scheduler:
+                # first batch, next ones will be asked by the host
+                begin, end = scheduler.next_batch(host_weight)
+            else:
+                end = begin + chunk * host_weight
+                if remainder > 0:
+                    end = end + host_weight
+                    if end > sample_size:
+                        end = sample_size
+                    remainder -= host_weight
 
             if end - begin <= 0:
                 # more hosts than points
                 break
-
-            # todo, write locally if nfs everywhere
-            channel = remote_communicator.RemoteCommunicatorSSH(
-                wd_hosts_out=hosts_out)
-            try:
-                channel.connect(host)
-            except:
-                ex_info = traceback.format_exc()
-                hosts_out.add_warn(host, 'error during connection '
-                                   'initialization. Message: ' + str(ex_info))
-                raise Exception('error during connection initialization. '
-                                'Message: ' + str(ex_info))
-
-            # guess NFS
-            # try:
-            #    channel.launch('ls ' + self.hosts_workdir)
-            # except: # workdir was not found
-            #    hosts_nfs[host] = False
-            # else: # workdir was found
-            #    hosts_nfs[host] = True
-            #    self.log(host, "workdir " + self.hosts_workdir + " already exists. Assume tmpdir is on shared filesystem.")
-
-            # create remote workdir
-            # if not hosts_nfs[host]:
-            channel.mkdir(hosts_workdir)
-
-            # create input file
-            wd_host_in = wrapper_data.WrapperDataHostIn()
-            wd_host_in.copy(self.wd_hosts_in)
-            wd_host_in.sample = self.wd_hosts_in.sample[begin:end]
-            wd_host_in.hostname = host
-            wd_host_in.first_id = begin
-            wd_host_in.workdir = hosts_workdir
-            wd_host_in.set_dirname(hosts_workdir)
-
-            # if nfs_everywhere:
-            #    handle = open(wd_host_in.get_fullname(), 'wb')
-            #    handle.write(in_sample_pkl)
-            #    handle.close()
-            # else:
-            wd_host_in.handle = channel.open(wd_host_in.get_fullname(), 'w')
-            wd_host_in.write()
-
-            # send python files
-            # todo: warning if overwriting files?
-            # if host_num == 0 and nfs_everywhere:
-            #    for f in self.files_to_send.keys():
-            #        shutil.copy(f, self.hosts_workdir)
-            #    shutil.copy(self.wrapper_file, self.hosts_workdir + os.sep + self.user_wrapper + ".py")
-            # elif host_num == 0 or not nfs_on_hosts:
-            channel.send_files(files_to_send, hosts_workdir)
-            channel.send_file(self.wd_hosts_in.wrapper_file, 
-                              hosts_workdir + os.sep + core_dispatcher.user_wrapper + 
-                              os.path.splitext(self.wd_hosts_in.wrapper_file)[1])
-
-            # launch the core dispatcher and do not wait it
-            err_file = hosts_workdir + os.sep + 'core_dispatcher_launcher.err'
-            channel.launch(self.remote_python_exe + " " + hosts_workdir +
-                           os.sep + core_dispatcher_launcher + " " +
-                           wd_host_in.get_fullname() +
-                           " > " + err_file + " 2>&1",
-                           detached=True)
-
-            if self.wd_hosts_in.extended_check:
-                # check if detached processus succeed to start. Avoid this
-                # check if possible cause it slow down the launch processus.
-                retry = 5
-                err_msg = ""
-                while retry != 0:
-                    try:
-                        # fixme: ugly: wait a little, otherwise, sometimes the
-                        # failed process has not the time to fill the err file
-                        time.sleep(1)
-                        handle = channel.open(err_file)
-                        err_msg = handle.read()
-                        handle.close()
-                    except (IOError, EOFError):
-                        hosts_out.add_debug(err_file + " not found for host " +
-                                            host + ", try again later.")
-                        retry -= 1
-                    else:
-                        if err_msg != "":
-                            hosts_out.add_warn(host, "The core_dispatcher_launcher "
-                                               "failed ! Error msg: " + err_msg)
-                            raise Exception("The core_dispatcher_launcher "
-                                            "failed on host " + host +
-                                            "! Error msg: " + err_msg)
-                        break
-                if retry == 0:
-                    hosts_out.add_warn(host, err_file + " not found!")
-
-            self.hosts_channel[host] = channel
-
-            host_num += 1
+            hosts_ids.append([host, begin, end])
             begin = end
 
-        sleep_time_max = 120
-        sleep_time_mult = 1.5
-
-        # todo: parallel fetch: try to get results of each hosts anytimes
-        for host, host_weight in hosts:
-            # stop command received
-            if self.stop:
-                hosts_out.add_warn(
-                    host, 'Stopped while start retrieving results')
-                errors_appear = True
-                break
-
-            if host not in self.hosts_channel:
-                # more hosts than points
-                break
-
-            channel = self.hosts_channel[host]
+        # bootstrap the hosts concurrently: each host starts computing as
+        # soon as its own files are sent
+        bootstrap_errors = []
+        # hosts whose core dispatcher has been launched
+        bootstrapped = set()
+        bootstrap_slots = threading.Semaphore(
+            max(1, self.wd_hosts_in.max_bootstrap))
 
-            # init object that will parse data from the remote host
-            wd_host_out = wrapper_data.WrapperDataHostOut()
-            wd_host_out.set_hostname(host)
-            wd_host_out.set_dirname(hosts_workdir)
-
-            # init to 2 seconds
-            # todo: init 10s
-            sleep_time = 1
-            # todo: host_out_errors ugly hierarchy
-            self.host_out_errors = []
-
-            # try to get results
-            self.output_file_lines_read = 0
-            host_compute = True
-            while host_compute:
+        def bootstrap(host, begin, end):
+            try:
                 # stop command received
                 if self.stop:
-                    hosts_out.add_warn(host, 'Stopped compute while waiting '
-                                       'results')
-                    errors_appear = True
-                    break
-
-                try:
-                    # little optimization: try nfs
-                    wd_host_out.handle = open(wd_host_out.get_fullname(), 'rb')
-                    hosts_out.add_debug("file " + wd_host_out.get_fullname() +
-                                        " found on localhost.")
-                except:
-                    # 37m :time python t_ot_wrapper.py -t remote -c ok -w
-                    # /cluster/tmp -s 100 -p 0.01 -d -n 1000000
-                    # (compute using hosts: ['localhost', 'node-4', 'node-3'])
-                    # no nfs
-                    try:
-                        wd_host_out.handle = channel.open(
-                            wd_host_out.get_fullname())
-                    except:
-                        hosts_out.add_debug("file " + wd_host_out.get_fullname() +
-                                            " still not found")
-                if wd_host_out.handle != None:
-                    # file found, read it
-                    new_data = wd_host_out.read()
-
-                    # parse data
-                    if new_data:
-                        log = wd_host_out.get_next_log()
-                        while log:
-                            flag = log[0]
-                            timestamp = log[1]
-                            data = log[2]
-                            if flag != hosts_out.flag_sample:
-                                hosts_out.add_log(flag, data, timestamp)
-                                if flag == hosts_out.flag_error:
-                                    errors_appear = True
-                            log = wd_host_out.get_next_log()
-                        if wd_host_out.sample:
-                            hosts_out.sample += wd_host_out.sample
-                            host_compute = False
-
-                if host_compute:
-                    # todo, less verbose, give number of point calculated
-                    hosts_out.add_debug("compute on host " + host +
-                                        " not finished, check again in " +
-                                        str(sleep_time) + "s")
-                    time.sleep(sleep_time)
-                    # compute next sleep time
-                    sleep_time = int(math.ceil(sleep_time * sleep_time_mult))
-                    if sleep_time > sleep_time_max:
-                        sleep_time = sleep_time_max
-
-        # cleanup when everything has been computed
+                    pass
+                elif host in self.hosts_channel:
+                    # session: its core dispatcher waits for the sample
+                    self.send_session_sample(host, begin, end)
+                else:
+                    self.bootstrap_host(host, begin, end, files_to_send)
+                bootstrapped.add(host)
+            except Exception as exc:
+                bootstrap_errors.append('host ' + host + ': ' + str(exc))
+            finally:
+                bootstrap_slots.release()
+
+        bootstrap_threads = []
+        for host, begin, end in hosts_ids:
+            bootstrap_slots.acquire()
+            thread = threading.Thread(target=bootstrap,
+                                      args=(host, begin, end))
+            thread.start()
+            bootstrap_threads.append(thread)
+        for thread in bootstrap_threads:
+            thread.join()
+        self.remove_probe()
+
+        # stop command received
+        if self.stop:
+            hosts_out.add_debug('stopped while launching compute')
+            errors_appear = True
+
+        if bootstrap_errors:
+            # do not let the well started hosts compute for nothing
+            self.stop_now()
+            # the workdirs of the well started hosts are useless
+            cleaner = get_cleaner()
+            # the shared workdir is kept if a failed host wrote in it
+            keep_shared = [host for host, begin, end in hosts_ids if
+                           host not in bootstrapped and
+                           host in self.hosts_shared]
+            for host, channel in self.hosts_channel.items():
+                if self.wd_hosts_in.cleanup != "no" and host in bootstrapped:
+                    if host in self.hosts_shared:
+                        if not keep_shared:
+                            cleaner.remove_dir(hosts_workdir)
+                    else:
+                        cleaner.add(channel.rmdir, hosts_workdir)
+                cleaner.add(channel.disconnect)
+            self.stop = False
+            self.session_started = False
+            raise Exception('\n'.join(bootstrap_errors))
+        self.session_started = session
+
+        # monitor every hosts at the same time
+        if self.collect_results(hosts_ids, scheduler):
+            errors_appear = True
+
+        # cleanup when everything has been computed, in background: the
+        # results are given without waiting for it (see wait_cleanup)
+        cleaner = get_cleaner()
+        sample_hosts = [host for host, begin, end in hosts_ids]
+        # session: the session workdir is kept until close_session
+        self.session_errors = self.session_errors or errors_appear
         for host, host_weight in hosts:
-            if host not in self.hosts_channel:
+            if host not in self.hosts_channel or host not in sample_hosts:
                 # more hosts than points
-                break
+                continue
             channel = self.hosts_channel[host]
 
             # cleanup
@@ -465,36 +516,524 @@ class HostDispatcher(object):
             # (self.cleanup == "ok" and host not in hosts_with_errors):
             if self.wd_hosts_in.cleanup == "all" or \
                (self.wd_hosts_in.cleanup == "ok" and not errors_appear):
-                channel.rmdir(hosts_workdir)
+                if host in self.hosts_shared:
+                    cleaner.remove_dir(self.sample_workdir)
+                else:
+                    cleaner.add(channel.rmdir, self.sample_workdir)
 
-            channel.disconnect()
+            if not session:
+                cleaner.add(channel.disconnect)
 
         # reset stopper
         self.stop = False
 
+    def bootstrap_host(self, host, begin, end, files_to_send):
+        """
+        send the points [begin, end[ and the files to a host, then launch
+        the core dispatcher on it without waiting for it.
+        raise an exception if the host could not be started
+        """
+        import remote_communicator
+
+        hosts_out = self.wd_hosts_out
+        hosts_workdir = self.hosts_workdir
+
+        # todo, write locally if nfs everywhere
+        channel = remote_communicator.RemoteCommunicatorSSH(
+            wd_hosts_out=hosts_out)
+        channel.debug = hosts_out.debug
+        try:
+            channel.connect(host)
+        except:
+            ex_info = traceback.format_exc()
+            hosts_out.add_warn(host, 'error during connection '
+                               'initialization. Message: ' + str(ex_info))
+            raise Exception('error during connection initialization of '
+                            'host ' + host + '. Message: ' + str(ex_info))
+        self.hosts_channel[host] = channel
+
+        # guess NFS
+        shared = False
+        if self.probe:
+            probe_file, token = self.probe
+            shared = channel.launch_output(
+                'cat ' + probe_file + ' 2>/dev/null; true').strip() == token
+        if shared:
+            self.hosts_shared.add(host)
+            hosts_out.add_debug("workdir " + hosts_workdir + " of host " +
+                                host + " is on a shared filesystem")
+
+        # create input file
+        wd_host_in = self.get_host_in(host, begin, end)
+        self.hosts_sample_num[host] = 1
+
+        # send the input file, the python files and the wrapper at once (the
+        # remote workdir is created if needed)
+        # todo: warning if overwriting files?
+        wrapper_file = self.wd_hosts_in.wrapper_file
+        files = files_to_send + [[wrapper_file, core_dispatcher.user_wrapper +
+                                  os.path.splitext(wrapper_file)[1]]]
+        if shared:
+            # no transfer: write the files directly
+            self.copy_shared_files(files)
+            wd_host_in.write()
+        else:
+            channel.compress = self.wd_hosts_in.compress_files
+            links = {}
+            if self.files_hash:
+                files, links = self.send_to_cache(channel, files)
+            channel.send_files(files, hosts_workdir,
+                               {wd_host_in.get_filename(): wd_host_in.dumps()},
+                               links)
+
+        # launch the core dispatcher and do not wait it
+        err_file = hosts_workdir + os.sep + 'core_dispatcher_launcher.err'
+        cmd = self.remote_python_exe + " " + hosts_workdir + os.sep + \
+            core_dispatcher_launcher + " " + wd_host_in.get_fullname()
+        if not self.wd_hosts_in.stream_results:
+            channel.launch(cmd + " > " + err_file + " 2>&1", detached=True)
+        elif is_localhost(host):
+            # same node: the results are sent through a local socket
+            server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server.bind(('127.0.0.1', 0))
+            server.listen(1)
+            server.settimeout(60)
+            cmd += " 127.0.0.1:" + str(server.getsockname()[1])
+            try:
+                channel.launch(cmd + " > " + err_file + " 2>&1",
+                               detached=True)
+                conn = server.accept()[0]
+            finally:
+                server.close()
+            conn.settimeout(None)
+            self.hosts_stream[host] = conn.makefile('rb')
+            conn.close()
+        else:
+            # the results are sent through the ssh connection kept open
+            self.hosts_stream[host] = channel.launch_stream(
+                cmd + " stdout 2> " + err_file)
+
+        if self.wd_hosts_in.extended_check:
+            # check if detached processus succeed to start. Avoid this
+            # check if possible cause it slow down the launch processus.
+            retry = 5
+            err_msg = ""
+            while retry != 0:
+                try:
+                    # fixme: ugly: wait a little, otherwise, sometimes the
+                    # failed process has not the time to fill the err file
+                    time.sleep(1)
+                    handle = channel.open(err_file)
+                    err_msg = handle.read()
+                    handle.close()
+                except (IOError, EOFError):
+                    hosts_out.add_debug(err_file + " not found for host " +
+                                        host + ", try again later.")
+                    retry -= 1
+                else:
+                    if err_msg != "":
+                        hosts_out.add_warn(host, "The core_dispatcher_launcher "
+                                           "failed ! Error msg: " + err_msg)
+                        raise Exception("The core_dispatcher_launcher "
+                                        "failed on host " + host +
+                                        "! Error msg: " + err_msg)
+                    break
+            if retry == 0:
+                hosts_out.add_warn(host, err_file + " not found!")
+
+    def get_host_in(self, host, begin, end):
+        """ return the input data of a host: the points [begin, end[ """
+        wd_host_in = wrapper_data.WrapperDataHostIn()
+        wd_host_in.copy(self.wd_hosts_in)
+        wd_host_in.sample = self.wd_hosts_in.sample[begin:end]
+        wd_host_in.hostname = host
+        wd_host_in.first_id = begin
+        wd_host_in.workdir = self.sample_workdir
+        wd_host_in.set_dirname(self.hosts_workdir)
+        return wd_host_in
+
+    def send_session_sample(self, host, begin, end):
+        """
+        give the points [begin, end[ to the core dispatcher of a host that
+        waits for the next sample of the session
+        """
+        wd_host_in = self.get_host_in(host, begin, end)
+        self.hosts_sample_num[host] += 1
+        wd_host_in.set_session_num(self.hosts_sample_num[host])
+        self.write_host_file(host, wd_host_in)
+        self.wd_hosts_out.add_debug("sample " + str(self.n_samples) +
+                                    " of the session (" + str(end - begin) +
+                                    " points) sent to " + host)
+
+    def write_host_file(self, host, wd):
+        """ write a file read by a host while it computes (WrapperData) """
+        if host in self.hosts_shared:
+            # write then rename: the host never reads a partial file
+            fullname = wd.get_fullname()
+            wd.handle = open(fullname + '.tmp', 'wb')
+            wd.write()
+            os.rename(fullname + '.tmp', fullname)
+        else:
+            wd.handle = self.hosts_channel[host].open(wd.get_fullname(), 'w')
+            wd.write()
+
+    def close_session(self):
+        """
+        end the session: the core dispatchers of the hosts stop, the workdir
+        is removed (according to cleanup) and the hosts disconnected in
+        background (see wait_cleanup)
+        """
+        if not self.session_started:
+            return
+        self.session_started = False
+
+        if self.session_broken:
+            # the core dispatchers may not be able to read the end of the
+            # session
+            self.stop_now()
+        for host, channel in self.hosts_channel.items():
+            if self.session_broken:
+                break
+            # an empty sample ends the session
+            wd_host_in = wrapper_data.WrapperDataHostIn(host)
+            wd_host_in.set_session_num(self.hosts_sample_num[host] + 1)
+            wd_host_in.set_dirname(self.hosts_workdir)
+            try:
+                self.write_host_file(host, wd_host_in)
+            except:
+                self.wd_hosts_out.add_debug('unable to end the session of '
+                                            'host ' + host + ' (' +
+                                            traceback.format_exc() + ')')
+
+        cleaner = get_cleaner()
+        for host, channel in self.hosts_channel.items():
+            if self.wd_hosts_in.cleanup == "all" or \
+               (self.wd_hosts_in.cleanup == "ok" and not self.session_errors):
+                if host in self.hosts_shared:
+                    cleaner.remove_dir(self.hosts_workdir)
+                else:
+                    cleaner.add(channel.rmdir, self.hosts_workdir)
+            cleaner.add(channel.disconnect)
+        for stream in self.hosts_stream.values():
+            cleaner.add(stream.close)
+        self.hosts_channel = {}
+        self.hosts_stream = {}
+
+    def create_probe(self):
+        """
+        create the workdir localy with a probe file in it in order to know
+        the hosts that share the workdir with the current host
+        """
+        self.probe = None
+        self.hosts_shared = set()
+        self.shared_files_copied = False
+        self.shared_files_lock = threading.Lock()
+        probe_file = self.hosts_workdir + os.sep + '.probe'
+        try:
+            os.makedirs(self.hosts_workdir)
+            handle = open(probe_file, 'w')
+            token = socket.gethostname() + ' ' + str(os.getpid()) + ' ' + \
+                str(time.time())
+            handle.write(token)
+            handle.close()
+        except:
+            self.wd_hosts_out.add_debug('unable to create the workdir ' +
+                                        self.hosts_workdir + ' localy, no '
+                                        'shared filesystem assumed')
+            return
+        self.probe = [probe_file, token]
+
+    def remove_probe(self):
+        """ remove the probe (and the local workdir if it is not shared) """
+        if not self.probe:
+            return
+        if self.hosts_shared:
+            os.remove(self.probe[0])
+        else:
+            shutil.rmtree(self.hosts_workdir, ignore_errors=True)
+        self.probe = None
+
+    def copy_shared_files(self, files):
+        """
+        copy the files in the workdir seen by the hosts sharing it (only
+        once for every hosts)
+        """
+        self.shared_files_lock.acquire()
+        try:
+            if self.shared_files_copied:
+                return
+            import remote_communicator
+            for fic in files:
+                local_file, remote_name = \
+                    remote_communicator.split_file_name(fic)
+                target = self.hosts_workdir + os.sep + remote_name
+                if os.path.exists(target):
+                    continue
+                # copy then rename: a host never reads a partial file
+                tmp_target = target + '.tmp'
+                if os.path.isdir(local_file):
+                    shutil.copytree(local_file, tmp_target)
+                else:
+                    shutil.copy(local_file, tmp_target)
+                os.rename(tmp_target, target)
+            self.shared_files_copied = True
+        finally:
+            self.shared_files_lock.release()
+
+    def send_to_cache(self, channel, files):
+        """
+        send the user files missing in the cache of a host. The cache is
+        kept between computations: a file is sent only once.
+        files: list of files to send in the workdir
+        return: [files, links]: the files still to send in the workdir and
+            the links to create in the workdir to the files of the cache
+        """
+        import remote_communicator
+
+        cache_dir = self.wd_hosts_in.remote_tmpdir + os.sep + remote_cache_dir
+        other_files = []
+        cached_files = []
+        for fic in files:
+            local_file, remote_name = remote_communicator.split_file_name(fic)
+            if local_file in self.files_hash:
+                cached_files.append([local_file, remote_name,
+                                     self.files_hash[local_file]])
+            else:
+                other_files.append(fic)
+
+        # ask the host which files it has not yet
+        hashes = sorted(set([h for l, r, h in cached_files]))
+        missing = channel.launch_output(
+            'mkdir -p ' + cache_dir + ' && cd ' + cache_dir +
+            ' && for h in ' + ' '.join(hashes) +
+            '; do [ -e $h ] || echo $h; done').split()
+        to_send = {}
+        for local_file, remote_name, file_hash in cached_files:
+            if file_hash in missing:
+                to_send[file_hash] = [local_file, file_hash]
+        if to_send:
+            self.wd_hosts_out.add_debug('send ' + str(len(to_send)) +
+                                        ' files to the cache of host ' +
+                                        channel.host)
+            channel.send_files(list(to_send.values()), cache_dir)
+
+        links = {}
+        for local_file, remote_name, file_hash in cached_files:
+            links[remote_name] = cache_dir + os.sep + file_hash
+        return [other_files, links]
+
+    def read_host_out(self, channel, wd_host_out):
+        """
+        read the new data written in the host_out file of a host
+        return: True if new data have been read
+        """
+        hosts_out = self.wd_hosts_out
+        if wd_host_out.handle is None:
+            try:
+                # little optimization: try nfs
+                wd_host_out.handle = open(wd_host_out.get_fullname(), 'rb')
+                hosts_out.add_debug("file " + wd_host_out.get_fullname() +
+                                    " found on localhost.")
+            except:
+                # 37m :time python t_ot_wrapper.py -t remote -c ok -w
+                # /cluster/tmp -s 100 -p 0.01 -d -n 1000000
+                # (compute using hosts: ['localhost', 'node-4', 'node-3'])
+                # no nfs
+                try:
+                    wd_host_out.handle = channel.open(
+                        wd_host_out.get_fullname())
+                except:
+                    hosts_out.add_debug("file " + wd_host_out.get_fullname() +
+                                        " still not found")
+                    return False
+            # keep the handle open: each read only transfers the new data
+            wd_host_out.keep_open = True
+        return wd_host_out.read()
+
+    def send_batch(self, host, batch_num, batch_ids):
+        """
+        send the points [begin, end[ of the sample to a host that asked for
+        them (an empty batch tells the host that the sample is exhausted)
+        """
+        begin, end = batch_ids
+        wd_batch = wrapper_data.WrapperDataBatch(host, batch_num)
+        wd_batch.set_dirname(self.sample_workdir)
+        wd_batch.sample = self.wd_hosts_in.sample[begin:end]
+        wd_batch.first_id = begin
+        wd_batch.sample_codec = self.wd_hosts_in.sample_codec
+        self.write_host_file(host, wd_batch)
+        self.wd_hosts_out.add_debug("batch " + str(batch_num) + " of " +
+                                    str(end - begin) + " points sent to " +
+                                    host)
+
+    def collect_results(self, hosts_ids, scheduler=None):
+        """
+        monitor every hosts at the same time, one thread per host: logs are
+        forwarded as soon as they are read and the results of a host are put
+        in place as soon as it has finished.
+        hosts_ids: [host, begin, end] of each host
+        scheduler: give new batches of points to the hosts (dynamic schedule)
+        return: True if errors appeared
+        """
+        self.wd_hosts_out.sample = [None] * len(self.wd_hosts_in.sample)
+        self.collect_errors = False
+        # exception raised while monitoring a host: {host: exception}
+        monitor_errors = {}
+
+        def monitor(host, first_id):
+            try:
+                self.monitor_host(host, first_id, scheduler)
+            except Exception as exc:
+                self.wd_hosts_out.add_warn(host, 'error while monitoring '
+                                           'host ' + host + ': ' +
+                                           traceback.format_exc())
+                monitor_errors[host] = exc
+                self.collect_errors = True
+                # the other hosts would compute for nothing
+                self.stop_now()
+
+        threads = []
+        monitored_hosts = []
+        for host, begin, end in hosts_ids:
+            if host not in self.hosts_channel:
+                continue
+            thread = threading.Thread(target=monitor, args=(host, begin))
+            thread.start()
+            threads.append(thread)
+            monitored_hosts.append(host)
+        for thread in threads:
+            thread.join()
+
+        for host in monitored_hosts:
+            if host in monitor_errors:
+                raise monitor_errors[host]
+
+        return self.collect_errors
+
+    def monitor_host(self, host, first_id, scheduler=None):
+        """
+        get the logs and the results of a host until it has finished.
+        first_id: global indice of the first point of the host
+        """
+        hosts_out = self.wd_hosts_out
+        channel = self.hosts_channel[host]
+
+        # init object that will parse data from the remote host
+        wd_host_out = wrapper_data.WrapperDataHostOut()
+        wd_host_out.set_hostname(host)
+        wd_host_out.set_dirname(self.sample_workdir)
+
+        stream = self.hosts_stream.get(host)
+        if stream is not None:
+            # stream mode: the rows are read as soon as they are sent
+            while wd_host_out.read_stream(stream):
+                self.forward_logs(host, wd_host_out, scheduler)
+                if wd_host_out.sample is not None:
+                    self.place_results(wd_host_out, first_id, scheduler)
+                    break
+            else:
+                if not self.stop:
+                    hosts_out.add_warn(host, 'Results stream of host ' +
+                                       host + ' closed before the end of '
+                                       'the compute')
+                self.collect_errors = True
+                self.session_broken = True
+            if not self.session_started or self.session_broken:
+                stream.close()
+            return
+
+        sleep_time_mult = 1.5
+        if scheduler:
+            # the host may be waiting for its next batch: stay reactive
+            sleep_time_init = 0.5
+            sleep_time_max = 5
+        else:
+            sleep_time_init = 1
+            # logs are forwarded while the host computes: do not wait
+            # too long between two reads
+            sleep_time_max = 10
+        sleep_time = sleep_time_init
+
+        while True:
+            # stop command received
+            if self.stop:
+                hosts_out.add_warn(host, 'Stopped compute while waiting '
+                                   'results')
+                self.collect_errors = True
+                return
+
+            if self.read_host_out(channel, wd_host_out):
+                self.forward_logs(host, wd_host_out, scheduler)
+                if wd_host_out.sample is not None:
+                    wd_host_out.close_file()
+                    self.place_results(wd_host_out, first_id, scheduler)
+                    return
+
+                if scheduler:
+                    sleep_time = sleep_time_init
+
+            # todo, less verbose, give number of point calculated
+            hosts_out.add_debug("compute on host " + host +
+                                " not finished, check again in " +
+                                str(sleep_time) + "s")
+            time.sleep(sleep_time)
+            # compute next sleep time
+            sleep_time = sleep_time * sleep_time_mult
+            if not scheduler:
+                sleep_time = int(math.ceil(sleep_time))
+            if sleep_time > sleep_time_max:
+                sleep_time = sleep_time_max
+
+    def forward_logs(self, host, wd_host_out, scheduler=None):
+        """
+        forward the new logs read from a host, answer its requests of new
+        batches of points
+        """
+        hosts_out = self.wd_hosts_out
+        log = wd_host_out.get_next_log()
+        while log:
+            flag = log[0]
+            timestamp = log[1]
+            data = log[2]
+            if flag == hosts_out.flag_request:
+                host_weight = dict(self.wd_hosts_in.hosts)[host]
+                self.send_batch(host, data, scheduler.next_batch(host_weight))
+            elif flag != hosts_out.flag_sample:
+                hosts_out.add_log(flag, data, timestamp)
+                if flag == hosts_out.flag_error:
+                    self.collect_errors = True
+            log = wd_host_out.get_next_log()
+
+    def place_results(self, wd_host_out, first_id, scheduler=None):
+        """ put the results of a host in the out sample """
+        hosts_out = self.wd_hosts_out
+        if scheduler:
+            # points are given with their global indices
+            for global_id, out_point in wd_host_out.sample:
+                hosts_out.sample[global_id] = out_point
+        else:
+            end_id = first_id + len(wd_host_out.sample)
+            hosts_out.sample[first_id:end_id] = wd_host_out.sample
+
     def stop_now(self):
         """ stop and cleanup compute quickly """
         self.stop = True
+        # the core dispatchers of the session are stopped too
+        self.session_broken = True
 
         for host, host_weight in self.wd_hosts_in.hosts:
             # fixme: be more precise (if core dispatcher has been launched)
             if host not in self.hosts_channel:
                 # more hosts than points
-                break
+                continue
             channel = self.hosts_channel[host]
-            channel.launch("pkill -f '" + self.remote_python_exe + "." +
-                           self.hosts_workdir + os.sep +
-                           core_dispatcher_launcher + "'")
+            try:
+                channel.launch("pkill -f '" + self.remote_python_exe + "." +
+                               self.hosts_workdir + os.sep +
+                               core_dispatcher_launcher + "'")
+            except Exception as exc:
+                # keep stopping the other hosts
+                self.wd_hosts_out.add_warn(host, "could not stop child: " +
+                                           str(exc))
+                continue
             self.wd_hosts_out.add_debug("child " + host + " stopped")
-
-
-#    def is_localhost(self, hostname):
-#        local = False
-#        try:
-#            local = socket.getfqdn(hostname) == socket.getfqdn() or \
-#                socket.gethostbyname(hostname) == "127.0.0.1" or \
-#                socket.gethostname() == hostname
-#        except:
-#            local = False
-#        return local
-#
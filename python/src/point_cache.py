@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+#                                               -*- Python -*-
+#
+# @file  point_cache.py
+# @brief keep the out points already computed (sqlite database, k-d tree)
+#
+# Copyright (C) 2005-2013 EDF-EADS-Phimeca
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# along with this library.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @author souchaud
+# @date   2012-08-28
+#
+
+"""
+Keep the out points already computed in order to not compute them again:
+in a sqlite database (exact in points), or in a k-d tree (in points within a
+tolerance).
+"""
+
+import sqlite3
+import hashlib
+import pickle
+import threading
+import time
+import os
+
+# max number of parameters of a sqlite request
+max_request_keys = 500
+
+
+class PointCache(object):
+
+    """
+    out points indexed by a hash of their in point and of the context of the
+    computation (e.g. the wrapper_file and the user_data).
+    Once max_points points are stored, the least recently used ones are
+    removed.
+    """
+
+    def __init__(self, filename, max_points=100000):
+        self.filename = filename
+        self.max_points = max_points
+        # number of points found / not found in the cache
+        self.hits = 0
+        self.misses = 0
+
+        # the cache can be used by several threads one after the other
+        self.mutex = threading.Lock()
+        self.db = sqlite3.connect(filename, check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS points '
+                        '(key TEXT PRIMARY KEY, out_point BLOB, '
+                        'last_used REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS points_last_used '
+                        'ON points (last_used)')
+        self.db.commit()
+
+    def get_keys(self, context, sample):
+        """
+        return the keys of the points of the sample
+        context: string identifying the computation
+        """
+        sha = hashlib.sha1(context.encode('utf-8'))
+        keys = []
+        for point in sample:
+            point_sha = sha.copy()
+            point_sha.update(pickle.dumps([float(value) for value in point],
+                                          2))
+            keys.append(point_sha.hexdigest())
+        return keys
+
+    def get(self, keys):
+        """
+        return the out points found in the cache: {key: out_point}
+        """
+        found = {}
+        self.mutex.acquire()
+        try:
+            for begin in range(0, len(keys), max_request_keys):
+                request_keys = keys[begin:begin + max_request_keys]
+                rows = self.db.execute(
+                    'SELECT key, out_point FROM points WHERE key IN (' +
+                    ','.join('?' * len(request_keys)) + ')', request_keys)
+                for key, out_point in rows:
+                    found[key] = pickle.loads(bytes(out_point))
+            if found:
+                now = time.time()
+                self.db.executemany(
+                    'UPDATE points SET last_used = ? WHERE key = ?',
+                    [(now, key) for key in found])
+                self.db.commit()
+            self.hits += len([key for key in keys if key in found])
+            self.misses += len([key for key in keys if key not in found])
+        finally:
+            self.mutex.release()
+        return found
+
+    def put(self, points):
+        """
+        store the out points: {key: out_point}
+        """
+        if not points:
+            return
+        now = time.time()
+        self.mutex.acquire()
+        try:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO points VALUES (?, ?, ?)',
+                [(key, sqlite3.Binary(pickle.dumps(out_point, 2)), now) for
+                 key, out_point in points.items()])
+            # remove the least recently used points
+            n_points = self.db.execute(
+                'SELECT COUNT(*) FROM points').fetchone()[0]
+            if n_points > self.max_points:
+                self.db.execute(
+                    'DELETE FROM points WHERE key IN (SELECT key FROM points '
+                    'ORDER BY last_used LIMIT ?)',
+                    (n_points - self.max_points,))
+            self.db.commit()
+        finally:
+            self.mutex.release()
+
+    def size(self):
+        """ return the number of points stored """
+        self.mutex.acquire()
+        try:
+            return self.db.execute('SELECT COUNT(*) FROM points').fetchone()[0]
+        finally:
+            self.mutex.release()
+
+    def close(self):
+        self.mutex.acquire()
+        self.db.close()
+        self.mutex.release()
+
+
+class ToleranceCache(object):
+
+    """
+    out points of the points already computed, also given for the in points
+    close to them: |x_i - y_i| <= tolerance_i on each dimension i (the
+    closest point is chosen).
+    The in points are kept in a k-d tree, saved in a pickle file with the
+    context of the computation (the points of another context are dropped).
+    """
+
+    def __init__(self, filename, tolerance):
+        self.filename = filename
+        # a float, or one float per dimension
+        self.tolerance = tolerance
+        # number of points found / not found in the cache
+        self.hits = 0
+        self.misses = 0
+
+        self.context = None
+        # k-d tree nodes [in_point, out_point, axis, left, right], left and
+        # right being the indices of the children nodes, the root first
+        self.nodes = []
+        # shared by the samples computed at the same time (submit_sample)
+        self.mutex = threading.Lock()
+
+    def get_tolerance(self, dim):
+        if isinstance(self.tolerance, (list, tuple)):
+            return list(self.tolerance)
+        return [self.tolerance] * dim
+
+    def load(self, context):
+        """ get the points computed in the context from the file """
+        self.mutex.acquire()
+        try:
+            if context == self.context:
+                return
+            self.context = context
+            self.nodes = []
+            if not os.path.exists(self.filename):
+                return
+            handle = open(self.filename, 'rb')
+            try:
+                saved_context, points = pickle.load(handle)
+            finally:
+                handle.close()
+            if saved_context == context:
+                self.build(points)
+        finally:
+            self.mutex.release()
+
+    def save(self):
+        """ write the points in the file """
+        points = [[node[0], node[1]] for node in self.nodes]
+        handle = open(self.filename + '.tmp', 'wb')
+        try:
+            pickle.dump([self.context, points], handle, 2)
+        finally:
+            handle.close()
+        os.rename(self.filename + '.tmp', self.filename)
+
+    def build(self, points):
+        """ build a balanced tree from [[in_point, out_point], ...] """
+        self.nodes = []
+        # [points, axis, parent node, parent side]
+        todo = [[list(points), 0, None, None]]
+        while todo:
+            sub_points, axis, parent, side = todo.pop()
+            if not sub_points:
+                continue
+            sub_points.sort(key=lambda point: point[0][axis])
+            mid = len(sub_points) // 2
+            # the points equal on the axis go right, like insert does
+            while mid > 0 and \
+                    sub_points[mid - 1][0][axis] == sub_points[mid][0][axis]:
+                mid -= 1
+            in_point, out_point = sub_points[mid]
+            if parent is not None:
+                self.nodes[parent][side] = len(self.nodes)
+            self.nodes.append([in_point, out_point, axis, None, None])
+            next_axis = (axis + 1) % len(in_point)
+            todo.append([sub_points[:mid], next_axis, len(self.nodes) - 1, 3])
+            todo.append([sub_points[mid + 1:], next_axis,
+                         len(self.nodes) - 1, 4])
+
+    def insert(self, in_point, out_point):
+        """ private """
+        new_node = [in_point, out_point, 0, None, None]
+        if not self.nodes:
+            self.nodes.append(new_node)
+            return
+        node = self.nodes[0]
+        while True:
+            axis = node[2]
+            side = 3 if in_point[axis] < node[0][axis] else 4
+            if node[side] is None:
+                new_node[2] = (axis + 1) % len(in_point)
+                node[side] = len(self.nodes)
+                self.nodes.append(new_node)
+                return
+            node = self.nodes[node[side]]
+
+    def find(self, in_point, tolerance):
+        """
+        private
+        return the closest node within the tolerance, None if not found
+        """
+        best_node = None
+        best_dist = None
+        todo = [0] if self.nodes else []
+        while todo:
+            node = self.nodes[todo.pop()]
+            node_point = node[0]
+            if len(node_point) != len(in_point):
+                return None
+            dist = 0.
+            for value, node_value, tol in zip(in_point, node_point,
+                                              tolerance):
+                diff = abs(value - node_value)
+                if diff > tol:
+                    dist = None
+                    break
+                if tol > 0:
+                    dist = max(dist, diff / tol)
+            if dist is not None and (best_dist is None or dist < best_dist):
+                best_node = node
+                best_dist = dist
+            axis = node[2]
+            if node[3] is not None and \
+                    in_point[axis] - tolerance[axis] < node_point[axis]:
+                todo.append(node[3])
+            if node[4] is not None and \
+                    in_point[axis] + tolerance[axis] >= node_point[axis]:
+                todo.append(node[4])
+        return best_node
+
+    def get(self, sample):
+        """
+        return the out points found for the points of the sample (None if
+        not found)
+        """
+        out_sample = []
+        self.mutex.acquire()
+        try:
+            for in_point in sample:
+                node = self.find(in_point, self.get_tolerance(len(in_point)))
+                out_sample.append(None if node is None else node[1])
+            n_found = len([out_point for out_point in out_sample if
+                           out_point is not None])
+            self.hits += n_found
+            self.misses += len(out_sample) - n_found
+        finally:
+            self.mutex.release()
+        return out_sample
+
+    def put(self, points):
+        """ store and save the points: [[in_point, out_point], ...] """
+        if not points:
+            return
+        self.mutex.acquire()
+        try:
+            for in_point, out_point in points:
+                self.insert([float(value) for value in in_point], out_point)
+            self.save()
+        finally:
+            self.mutex.release()
+
+    def size(self):
+        """ return the number of points stored """
+        self.mutex.acquire()
+        try:
+            return len(self.nodes)
+        finally:
+            self.mutex.release()
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+#                                               -*- Python -*-
+#
+# @file  pool_worker.py
+# @brief Long-lived process that computes the points received through a pipe.
+#
+# Copyright (C) 2005-2013 EDF-EADS-Phimeca
+#
+# This library is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# along with this library.  If not, see <http://www.gnu.org/licenses/>.
+#
+# @author souchaud
+# @date   2012-08-28
+#
+
+"""
+Long-lived process that computes the points received through a pipe.
+
+The user_wrapper is imported only once. Protocol (pickle on stdin/stdout):
+  - first message: the user_data,
+  - then one message per point: [point_workdir, point, is_sample],
+    answer: [out_point, err_msg],
+    (is_sample: point is a batch of points computed by _exec_sample if the
+    wrapper defines it, answer an out sample)
+  - None (or end of file): stop the worker.
+"""
+
+import traceback
+import pickle
+import sys
+import os
+import time
+import threading
+
+# keep private handles on the pipes: the wrapper (or the programs it
+# launches) must not write into the protocol stream
+proto_in = os.fdopen(os.dup(sys.stdin.fileno()), 'rb')
+proto_out = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+devnull = os.open(os.devnull, os.O_RDONLY)
+os.dup2(devnull, sys.stdin.fileno())
+os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+# ensure the global workdir is searched for wrapper_data and user_wrapper
+global_workdir = os.getcwd()
+sys.path.append(global_workdir)
+
+import wrapper_data
+
+
+def check_parent(parent_pid):
+    """ stop current process (and it's children) if parent dies """
+    while True:
+        if os.getppid() != parent_pid:
+            # kill children's too (do not work on windows)
+            os.system('kill -- -' + str(os.getpgid(0)))
+            os._exit(1)
+        time.sleep(1)
+
+# parent_pid == 0: do not launch it on localhost cause it will kill the
+# initial python script!
+if len(sys.argv) == 2 and int(sys.argv[1]):
+    parent_checker = threading.Thread(target=check_parent,
+                                      args=(int(sys.argv[1]),))
+    parent_checker.daemon = True
+    parent_checker.start()
+
+
+def send(data):
+    """ send data to the core dispatcher """
+    pickle.dump(data, proto_out, pickle.HIGHEST_PROTOCOL)
+    proto_out.flush()
+
+
+import_err_msg = ''
+try:
+    import user_wrapper
+except:
+    import_err_msg = "ERROR during wrapper import:\n" + \
+        traceback.format_exc()
+
+try:
+    user_data = pickle.load(proto_in)
+except EOFError:
+    sys.exit(0)
+if not import_err_msg:
+    user_wrapper.user_data = user_data
+
+while True:
+    try:
+        request = pickle.load(proto_in)
+    except EOFError:
+        break
+    if request is None:
+        break
+
+    point_workdir, point, is_sample = request
+    out_point = None
+    err_msg = import_err_msg
+    if not err_msg:
+        try:
+            os.chdir(point_workdir)
+            if is_sample:
+                out_point = wrapper_data.exec_sample(user_wrapper, point)
+            else:
+                out_point = user_wrapper._exec(point)
+        except:
+            err_msg = "ERROR during wrapper execution:\n" + \
+                traceback.format_exc()
+        # leave the point's workdir: it may be removed
+        os.chdir(global_workdir)
+
+    send([out_point, err_msg])
@@ -33,6 +33,18 @@ import shlex
 import StringIO
 import string
 import stat
+import tarfile
+import time
+
+
+def split_file_name(fic):
+    """
+    return: [local_file, remote_name] of an element of a list of files to
+    send (see RemoteCommunicator.send_files)
+    """
+    if isinstance(fic, (list, tuple)):
+        return fic
+    return [fic, os.path.basename(fic)]
 
 
 class RemoteCommunicator(object):
@@ -49,6 +61,9 @@ class RemoteCommunicator(object):
         self.rm_exe = 'rm'
         self.chmod_exe = 'chmod'
 
+        # compress the files sent by send_files (if supported)
+        self.compress = False
+
     def log(self, msg):
         if self.debug == True:
             msg = 'host ' + self.host + ': ' + msg
@@ -84,11 +99,28 @@ class RemoteCommunicator(object):
         """ send file (or path recursively) to remote host """
         pass
 
-    def send_files(self, local_files, remote_dir):
-        """ send files (or path recursively) to remote host """
+    def send_files(self, local_files, remote_dir, files_data=None,
+                   links=None):
+        """
+        send files (or path recursively) to remote host
+
+        local_files: list of local files, or of [local_file, remote_name]
+            to give the file another name in remote_dir
+        files_data: {remote_name: content} of files to create in remote_dir
+        links: {remote_name: target} of symbolic links to create in remote_dir
+        """
         for fic in local_files:
-            remote_fic = remote_dir + self.os_sep + os.path.basename(fic)
-            self.send_file(fic, remote_fic)
+            local_file, remote_name = split_file_name(fic)
+            self.send_file(local_file, remote_dir + self.os_sep + remote_name)
+        if files_data:
+            for remote_name, data in files_data.items():
+                handle = self.open(remote_dir + self.os_sep + remote_name, 'w')
+                handle.write(data)
+                handle.close()
+        if links:
+            for remote_name, target in links.items():
+                self.launch('ln -s ' + target + ' ' + remote_dir +
+                            self.os_sep + remote_name)
 
     def receive(self, remote_files, localDir):
         raise Exception('Not implemented!')
@@ -116,6 +148,24 @@ class RemoteCommunicator(object):
         """
         raise Exception('Not implemented!')
 
+    def launch_output(self, cmd):
+        """
+        launch cmd and wait for its completion
+        raise an exception if the command failed
+
+        return: the stdout of the command
+        """
+        raise Exception('Not implemented!')
+
+    def launch_stream(self, cmd):
+        """
+        launch cmd without waiting for its completion, its stdout being kept
+        open.
+
+        return: a file object reading the stdout of the command
+        """
+        raise Exception('Not implemented!')
+
 
 class RemoteCommunicatorSSH(RemoteCommunicator):
 
@@ -136,6 +186,10 @@ class RemoteCommunicatorSSH(RemoteCommunicator):
         self.cat_exe = 'cat'
         self.head_exe = 'head'
         self.tail_exe = 'tail'
+        self.tar_exe = 'tar'
+
+        # ssh process whose stdout is kept open (see launch_stream)
+        self.stream_process = None
 
     def connect(self, host):
         RemoteCommunicator.connect(self, host)
@@ -147,6 +201,10 @@ class RemoteCommunicatorSSH(RemoteCommunicator):
                 shlex.split(real_cmd), shell=False)
 
     def disconnect(self):
+        if self.stream_process is not None:
+            # the stream is closed once the command is finished
+            self.stream_process.wait()
+            self.stream_process = None
         if self.reuse_ssh:
             # stop master conn
             self.ssh_master.terminate()
@@ -180,6 +238,33 @@ class RemoteCommunicatorSSH(RemoteCommunicator):
 
         return ret
 
+    def launch_output(self, cmd):
+        real_cmd = self.ssh_exe + ' ' + self.host + ' ' + cmd
+        self.log('exec cmd: ' + cmd)
+
+        p = subprocess.Popen(shlex.split(real_cmd), shell=False,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout_data, stderr_data = p.communicate()
+
+        ret = p.wait()
+        if ret == 255:
+            raise Exception('SSH error, check hostname (command :' + real_cmd +
+                            ' returned exit code ' + str(ret) + ')')
+        elif ret != 0:
+            raise Exception('Command (' + real_cmd + ') returned exit code ' +
+                            str(ret) + ': ' + stderr_data)
+        return stdout_data
+
+    def launch_stream(self, cmd):
+        # -n: do not let ssh read the stdin of the current process
+        real_cmd = self.ssh_exe + ' -n ' + self.host + ' ' + cmd
+        self.log('exec cmd: ' + cmd)
+
+        self.stream_process = subprocess.Popen(shlex.split(real_cmd),
+                                               shell=False,
+                                               stdout=subprocess.PIPE)
+        return self.stream_process.stdout
+
     def send_file(self, local_file, remote_file):
         self.log("send file: " + local_file)
 
@@ -218,6 +303,69 @@ class RemoteCommunicatorSSH(RemoteCommunicator):
             self.launch(
                 self.chmod_exe + ' ' + local_file_mod + ' ' + remote_file)
 
+    def send_files(self, local_files, remote_dir, files_data=None,
+                   links=None):
+        """
+        send every files in one tar stream, unpacked by one remote command
+        (the remote_dir is created if needed, permissions are kept and
+        already existing files are not overwritten)
+        """
+        self.log("send files: " + str(local_files) + " to " + remote_dir)
+
+        # the files are extracted in a temporary dir first, then moved
+        # atomically: an other host sharing the dir never reads a partial file
+        remote_cmd = self.mkdir_exe + ' -p ' + remote_dir + \
+            ' && T=$(mktemp -d ' + remote_dir + '/.send.XXXXXX)' + \
+            ' && ' + self.tar_exe + ' -C $T -xp' + \
+            ('z' if self.compress else '') + 'f -' + \
+            ' && cd $T && for f in * .[!.]*; do [ -e "$f" ] || continue;' + \
+            ' [ -e "../$f" ] || mv "$f" ..; done; cd .. && ' + \
+            self.rm_exe + ' -rf $T'
+        real_cmd = self.ssh_exe + ' ' + self.host + " '" + remote_cmd + "'"
+
+        p = subprocess.Popen(shlex.split(real_cmd), shell=False,
+                             stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        tar = tarfile.open(fileobj=p.stdin,
+                           mode='w|gz' if self.compress else 'w|',
+                           dereference=True)
+        remote_names = set()
+        try:
+            for fic in local_files:
+                local_file, remote_name = split_file_name(fic)
+                if remote_name in remote_names:
+                    continue
+                if not os.path.exists(local_file):
+                    raise Exception("local_file: " + local_file + " not found "
+                                    "on this host")
+                tar.add(local_file, arcname=remote_name)
+                remote_names.add(remote_name)
+            if files_data:
+                for remote_name, data in files_data.items():
+                    info = tarfile.TarInfo(remote_name)
+                    info.size = len(data)
+                    info.mode = 0644
+                    info.mtime = time.time()
+                    tar.addfile(info, StringIO.StringIO(data))
+            if links:
+                for remote_name, target in links.items():
+                    info = tarfile.TarInfo(remote_name)
+                    info.type = tarfile.SYMTYPE
+                    info.linkname = target
+                    info.mtime = time.time()
+                    tar.addfile(info)
+        finally:
+            tar.close()
+            p.stdin.close()
+        stderr_data = p.stderr.read()
+
+        ret = p.wait()
+        if ret == 255:
+            raise Exception('SSH error, check hostname (command :' + real_cmd +
+                            ' returned exit code ' + str(ret) + ')')
+        elif ret != 0:
+            raise Exception('Command (' + real_cmd + ') returned exit code ' +
+                            str(ret) + ': ' + stderr_data)
+
     def open(self, remote_file, mode='r'):
         self.log('open file: ' + remote_file)
         if mode == 'r' or mode == 'w':
@@ -236,9 +384,13 @@ class HandleSSH(object):
         # pos in the file
         self.pos = 0
 
-        # buffer
-        # todo: free buf already read
+        # buffer (data already read are dropped on seek)
         self.buf = ''
+        # pos in the file of the first byte of the buffer
+        self.buf_start = 0
+        # whether the remote file has been read since the last seek: the
+        # remote file is read at most once between two seeks
+        self.fetched = False
 
         # real pos of the file already read
         self.real_pos = 0
@@ -266,6 +418,17 @@ class HandleSSH(object):
     def seek(self, pos):
         if self.mode == 'w' and pos != 0:
             raise Exception('seek is possible only to pos 0 in write mode!')
+        if self.mode == 'r':
+            if pos < self.buf_start or pos > self.buf_start + len(self.buf):
+                # out of the buffer: next remote read starts from pos
+                self.buf = ''
+                self.buf_start = pos
+                self.real_pos = pos
+            else:
+                # drop the data before pos, they are not read anymore
+                self.buf = self.buf[pos - self.buf_start:]
+                self.buf_start = pos
+            self.fetched = False
         self.pos = pos
 
     def tell(self):
@@ -280,14 +443,13 @@ class HandleSSH(object):
 
         self.update_buf(size)
 
-        end_pos = self.pos + size
-        if size < 0 or len(self.buf) < end_pos:
-            data = self.buf[self.pos:]
-            self.pos = len(self.buf)
+        buf_pos = self.pos - self.buf_start
+        if size < 0 or len(self.buf) < buf_pos + size:
+            data = self.buf[buf_pos:]
         else:
             # the buf contain enough data
-            data = self.buf[self.pos:end_pos]
-            self.pos = end_pos
+            data = self.buf[buf_pos:buf_pos + size]
+        self.pos += len(data)
 
         return data
 
@@ -300,14 +462,15 @@ class HandleSSH(object):
 
     def internal_readline(self, buf_updated):
         """ private """
-        line_end_pos = string.find(self.buf, '\n', self.pos)
+        buf_pos = self.pos - self.buf_start
+        line_end_pos = string.find(self.buf, '\n', buf_pos)
         if line_end_pos != -1:
             line_end_pos += 1  # add \n
-            data = self.buf[self.pos:line_end_pos]
-            self.pos = line_end_pos
+            data = self.buf[buf_pos:line_end_pos]
+            self.pos += len(data)
         elif buf_updated == True:
-            data = self.buf[self.pos:]
-            self.pos = len(self.buf)
+            data = self.buf[buf_pos:]
+            self.pos += len(data)
         else:
             self.update_buf()
             data = self.internal_readline(True)
@@ -319,9 +482,14 @@ class HandleSSH(object):
         private
         size: min wanted read size
         """
-        if size < 0 or (size > 0 and len(self.buf) < self.pos + size):
-            # try to get everything
+        if self.fetched:
+            # wait for the next seek before reading the remote file again
+            return
+        buf_pos = self.pos - self.buf_start
+        if size < 0 or (size > 0 and len(self.buf) < buf_pos + size):
+            # try to get everything new since the last remote read
             self.buf += self.real_read()
+            self.fetched = True
 
     def real_read(self, size=-1):
         """
@@ -426,6 +594,8 @@ class HandleSSH(object):
         self.pos = 0
         self.real_pos = 0
         self.buf = ''
+        self.buf_start = 0
+        self.fetched = False
 
 
 class RemoteCommunicatorParamiko(RemoteCommunicator):
@@ -26,12 +26,20 @@
 
 
 import pickle  # don't use cpickle cause it don't work with file > 1Go
+import array
+import sys
 import os
+import io
 import threading
 import time
 
 script_name = "wrapper_data.py"
 
+# version of the sample codecs header: a reader refuses newer versions
+codec_version = 1
+# available sample codecs ('auto' picks float64 when possible)
+sample_codecs = ['auto', 'pickle', 'float64']
+
 
 def get_data(filename):
     """
@@ -49,7 +57,7 @@ def get_data(filename):
     header_found = False
 
     wds = [WrapperDataCoreOut(), WrapperDataCoreIn(), WrapperDataHostIn(),
-           WrapperDataHostOut()]
+           WrapperDataHostOut(), WrapperDataBatch(), WrapperDataCheckpoint()]
     for wd in wds:
         wd.handle = open(filename, 'rb')
         head_id = WrapperData.load(wd)
@@ -69,6 +77,86 @@ def get_data(filename):
     return ret
 
 
+def exec_sample(user_wrapper, sample):
+    """
+    compute a sample with the user_wrapper module: use its _exec_sample
+    function if defined, else call its _exec function on each point.
+
+    return: the out sample (a list of out points)
+    """
+    if hasattr(user_wrapper, '_exec_sample'):
+        out_sample = list(user_wrapper._exec_sample(sample))
+        if len(out_sample) != len(sample):
+            raise Exception('_exec_sample returned ' + str(len(out_sample)) +
+                            ' points instead of ' + str(len(sample)) + '!')
+    else:
+        out_sample = list(map(user_wrapper._exec, sample))
+    return out_sample
+
+
+def to_bytes(data):
+    """ raw content of an array.array or of a numpy array """
+    if hasattr(data, 'tobytes'):
+        return data.tobytes()
+    return data.tostring()
+
+
+def is_float64_array(sample):
+    """ whether the sample is a 2d numpy array of doubles """
+    return getattr(sample, 'ndim', None) == 2 and \
+        str(getattr(sample, 'dtype', '')) == 'float64'
+
+
+def encode_float64(sample, only_floats=False):
+    """
+    put a sample (a list of points of same dimension, or a 2d numpy array of
+    doubles) in a column-major array of doubles
+
+    only_floats: if True, the values must be python floats (an int would
+      come back as a float)
+    return: [n_cols, the raw data], None if the sample is not a matrix of
+      numbers
+    """
+    if is_float64_array(sample):
+        # numpy is not needed to read it
+        if sample.shape[0] == 0 or sample.shape[1] == 0:
+            return None
+        return [sample.shape[1], to_bytes(sample.T)]
+    if not isinstance(sample, list) or len(sample) == 0:
+        return None
+    try:
+        n_cols = len(sample[0])
+        if n_cols == 0:
+            return None
+        for point in sample:
+            if not isinstance(point, (list, tuple)) or len(point) != n_cols:
+                return None
+            if only_floats:
+                for value in point:
+                    if type(value) is not float:
+                        return None
+        data = array.array('d')
+        for col in range(n_cols):
+            data.extend([point[col] for point in sample])
+    except TypeError:
+        return None
+    return [n_cols, to_bytes(data)]
+
+
+def decode_float64(data, n_rows, n_cols):
+    """ rebuild the list of points from a column-major array of doubles """
+    columns = [data[col * n_rows:(col + 1) * n_rows] for col in range(n_cols)]
+    return [list(point) for point in zip(*columns)]
+
+
+class MemoryFile(io.BytesIO):
+
+    """ in-memory file whose content is kept once closed """
+
+    def close(self):
+        pass
+
+
 class WrapperData(object):
 
     """
@@ -80,6 +168,8 @@ class WrapperData(object):
     # data type
     # file type (core, host, hosts)
     flag_head = 'H'
+    # header of an encoded sample
+    flag_codec = 'C'
 
     def __init__(self):
         self.hostname = None
@@ -87,6 +177,10 @@ class WrapperData(object):
         self.dirname = None
 
         self.handle = None
+        # how dump_sample encodes the samples: 'pickle', 'float64' (raw
+        # doubles, column by column, if the sample is a matrix of numbers)
+        # or 'auto' (float64 only if the sample is a matrix of floats)
+        self.sample_codec = 'auto'
 
     def set_filename(self, filename):
         self.filename = filename
@@ -120,6 +214,14 @@ class WrapperData(object):
     def close_file(self):
         self.handle.close()
 
+    def dumps(self):
+        """ return the content of the file that write() would create """
+        self.handle = MemoryFile()
+        self.write()
+        data = self.handle.getvalue()
+        self.handle = None
+        return data
+
     def dump(self):
         """ serialize data """
         pickle.dump([self.flag_head, self.head_id], self.handle)
@@ -137,6 +239,67 @@ class WrapperData(object):
             head_id = None
         return head_id
 
+    def dump_sample(self, sample, handle=None):
+        """
+        serialize a sample with the codec self.sample_codec: a header
+        [flag_codec, codec_version, codec, info] followed by the data
+        """
+        if handle is None:
+            handle = self.handle
+        encoded = None
+        if self.sample_codec != 'pickle':
+            # fall back to pickle if the sample is not a matrix of numbers
+            # (e.g. it contains failed points)
+            encoded = encode_float64(sample, self.sample_codec == 'auto')
+        if encoded is None:
+            if is_float64_array(sample):
+                # the hosts may not have numpy
+                sample = sample.tolist()
+            pickle.dump([self.flag_codec, codec_version, 'pickle', None],
+                        handle)
+            pickle.dump(sample, handle)
+        else:
+            n_cols, data = encoded
+            info = [len(sample), n_cols, sys.byteorder]
+            pickle.dump([self.flag_codec, codec_version, 'float64', info],
+                        handle)
+            handle.write(data)
+
+    def load_sample(self, handle=None):
+        """
+        unserialize a sample written by dump_sample (or directly pickled by
+        the previous versions)
+        raise EOFError if the sample is not completely written
+        """
+        if handle is None:
+            handle = self.handle
+        header = pickle.load(handle)
+        if not isinstance(header, list) or len(header) != 4 or \
+                header[0] != self.flag_codec:
+            # not encoded
+            return header
+        version, codec, info = header[1:]
+        if version > codec_version:
+            raise Exception('Sample codec version ' + str(version) +
+                            ' is not supported!')
+        if codec == 'pickle':
+            return pickle.load(handle)
+        elif codec == 'float64':
+            n_rows, n_cols, byteorder = info
+            data = array.array('d')
+            size = n_rows * n_cols * data.itemsize
+            raw = handle.read(size)
+            if len(raw) != size:
+                raise EOFError('The sample is not completely written!')
+            if sys.version_info[0] < 3:
+                data.fromstring(raw)
+            else:
+                data.frombytes(raw)
+            if byteorder != sys.byteorder:
+                data.byteswap()
+            return decode_float64(data, n_rows, n_cols)
+        raise Exception('Unknown sample codec ' + str(codec) + '!')
+
 
 #    def write(self, string):
 #        """ write string to the file """
@@ -165,6 +328,8 @@ class WrapperDataCoreIn(WrapperData):
         super(WrapperDataCoreIn, self).__init__()
         self.point = None
         self.user_data = None
+        # batch of points, used instead of point
+        self.sample = None
         # self.set_dirname(dirname)
 
     def write(self):
@@ -172,6 +337,7 @@ class WrapperDataCoreIn(WrapperData):
         WrapperData.dump(self)
         pickle.dump(self.point, self.handle)
         pickle.dump(self.user_data, self.handle)
+        pickle.dump(self.sample, self.handle)
         self.close_file()
 
     def read(self):
@@ -179,11 +345,15 @@ class WrapperDataCoreIn(WrapperData):
         WrapperData.load(self)
         self.point = pickle.load(self.handle)
         self.user_data = pickle.load(self.handle)
+        self.sample = pickle.load(self.handle)
         self.close_file()
 
     def get_data(self):
         """ get only data """
         self.read()
+        if self.sample is not None:
+            print('A ' + self.head_id + ' sample has been found.')
+            return self.sample
         if self.point:
             print('A ' + self.head_id + ' point has been found.')
         return self.point
@@ -206,6 +376,7 @@ class WrapperDataCoreOut(WrapperDataCoreIn):
         WrapperData.dump(self)
         pickle.dump(self.point, self.handle)
         pickle.dump(self.err_msg, self.handle)
+        pickle.dump(self.sample, self.handle)
         self.close_file()
 
     def read(self):
@@ -214,6 +385,7 @@ class WrapperDataCoreOut(WrapperDataCoreIn):
             WrapperData.load(self)
             self.point = pickle.load(self.handle)
             self.err_msg = pickle.load(self.handle)
+            self.sample = pickle.load(self.handle)
             self.close_file()
         except IOError:
             self.err_msg = 'Could not read core file.'
@@ -245,6 +417,35 @@ class WrapperDataHostIn(WrapperData):
         self.separate_workdir = True
         self.cleanup = 'ok'
         self.user_data = None
+        # how the points are launched when separate_workdir is True:
+        # 'process' (one python process per point), 'pool' (one long-lived
+        # python process per core) or 'fork' (one process per point forked
+        # from a preloaded python process)
+        self.launch_mode = 'process'
+        # modules imported by the fork server before forking
+        self.preload_modules = []
+        # number of points given at once to a core when separate_workdir is
+        # True (computed in the same workdir, by _exec_sample if defined)
+        self.batch_size = 1
+        # when separate_workdir is False, split the sample across n_cores
+        # processes
+        self.multiprocess = False
+        # the host asks the frontal host for new batches of points once
+        # the sample is computed
+        self.dynamic_schedule = False
+        # how the files_to_send are put in each point's workdir:
+        # 'copy', 'hardlink', 'reflink' or 'recycle' (one workdir per thread
+        # reset between points)
+        self.provisioning = 'copy'
+        # whether the debug logs are recorded (they are only shown if the
+        # OpenTURNS debug log level is enabled)
+        self.debug = True
+        # the log of each finished point gives its out point too
+        self.send_out_points = False
+        # once its sample is computed, the remote host waits for the next
+        # sample of the session during session_timeout seconds (0: no
+        # session)
+        self.session_timeout = 0
 
     def copy(self, wd_host_in):
         """ copy the object """
@@ -261,13 +462,23 @@ class WrapperDataHostIn(WrapperData):
         self.separate_workdir = wd_host_in.separate_workdir
         self.cleanup = wd_host_in.cleanup
         self.user_data = wd_host_in.user_data
+        self.launch_mode = wd_host_in.launch_mode
+        self.preload_modules = wd_host_in.preload_modules
+        self.batch_size = wd_host_in.batch_size
+        self.multiprocess = wd_host_in.multiprocess
+        self.dynamic_schedule = wd_host_in.dynamic_schedule
+        self.provisioning = wd_host_in.provisioning
+        self.sample_codec = wd_host_in.sample_codec
+        self.debug = wd_host_in.debug
+        self.send_out_points = wd_host_in.send_out_points
+        self.session_timeout = wd_host_in.session_timeout
 
     def write(self):
         """ Store the object to a file. """
         self.open_file('wb')
 
         WrapperData.dump(self)
-        pickle.dump(self.sample, self.handle)
+        self.dump_sample(self.sample)
         pickle.dump(self.first_id, self.handle)
         pickle.dump(self.hostname, self.handle)
         pickle.dump(self.workdir_basename, self.handle)
@@ -278,6 +489,16 @@ class WrapperDataHostIn(WrapperData):
         pickle.dump(self.cleanup, self.handle)
         pickle.dump(self.files_to_send, self.handle)
         pickle.dump(self.user_data, self.handle)
+        pickle.dump(self.launch_mode, self.handle)
+        pickle.dump(self.preload_modules, self.handle)
+        pickle.dump(self.batch_size, self.handle)
+        pickle.dump(self.multiprocess, self.handle)
+        pickle.dump(self.dynamic_schedule, self.handle)
+        pickle.dump(self.provisioning, self.handle)
+        pickle.dump(self.sample_codec, self.handle)
+        pickle.dump(self.debug, self.handle)
+        pickle.dump(self.send_out_points, self.handle)
+        pickle.dump(self.session_timeout, self.handle)
 
         self.close_file()
 
@@ -286,7 +507,7 @@ class WrapperDataHostIn(WrapperData):
         self.open_file()
 
         WrapperData.load(self)
-        self.sample = pickle.load(self.handle)
+        self.sample = self.load_sample()
         self.first_id = pickle.load(self.handle)
         self.hostname = pickle.load(self.handle)
         self.workdir_basename = pickle.load(self.handle)
@@ -297,9 +518,24 @@ class WrapperDataHostIn(WrapperData):
         self.cleanup = pickle.load(self.handle)
         self.files_to_send = pickle.load(self.handle)
         self.user_data = pickle.load(self.handle)
+        self.launch_mode = pickle.load(self.handle)
+        self.preload_modules = pickle.load(self.handle)
+        self.batch_size = pickle.load(self.handle)
+        self.multiprocess = pickle.load(self.handle)
+        self.dynamic_schedule = pickle.load(self.handle)
+        self.provisioning = pickle.load(self.handle)
+        self.sample_codec = pickle.load(self.handle)
+        self.debug = pickle.load(self.handle)
+        self.send_out_points = pickle.load(self.handle)
+        self.session_timeout = pickle.load(self.handle)
 
         self.close_file()
 
+    def set_session_num(self, num):
+        """ the file gives the num-th sample of a session (num > 1) """
+        self.filename = self.head_id + '_' + str(self.hostname) + '_' + \
+            str(num) + self.file_suffix
+
     def get_data(self):
         self.read()
         if self.sample:
@@ -317,6 +553,8 @@ class WrapperDataHostOut(WrapperData):
 
     # sample content
     flag_sample = "S"
+    # the sample follows its row, encoded by dump_sample
+    flag_encoded = "ENC"
     # ensure whole previous line has been read
     flag_end = "END"
     # send finished point msg
@@ -327,6 +565,8 @@ class WrapperDataHostOut(WrapperData):
     flag_warn = "W"
     # send msg
     flag_debug = "D"
+    # ask for a new batch of points (dynamic schedule)
+    flag_request = "R"
 
     def set_hostname(self, hostname):
         self.hostname = hostname
@@ -346,12 +586,30 @@ class WrapperDataHostOut(WrapperData):
 
         # whether parameters are passed by file
         self.remote = remote
+        # add_debug records nothing if False
+        self.debug = True
 
         # useful for read tail
         self.tail_pos = 0
+        # do not close the handle once read: the next read only gets the
+        # data added since (the handle must support seek)
+        self.keep_open = False
+
+        # if set, file object where the rows are sent instead of the
+        # host_out file (stream mode)
+        self.stream = None
 
         self.dump_head = True
 
+        # remote: the rows are grouped in a buffer written once it exceeds
+        # write_buffer_size bytes, or every flush_interval seconds
+        self.write_buffer = io.BytesIO()
+        self.write_buffer_size = 65536
+        self.flush_interval = 1.
+        # rows written without delay (the frontal host waits for them)
+        self.flush_flags = [self.flag_error, self.flag_request]
+        self.flusher = None
+
     def add_log(self, flag, data, timestamp=None):
         """ thread safe """
         self.mutex.acquire()
@@ -363,12 +621,16 @@ class WrapperDataHostOut(WrapperData):
             self.write(log)
         self.mutex.release()
 
-    # todo: disable sending debug log, if disabled by OT
     def add_debug(self, msg):
-        self.add_log(self.flag_debug, msg)
+        if self.debug:
+            self.add_log(self.flag_debug, msg)
 
-    def add_point(self, point_id, point_data, compute_time):
-        self.add_log(self.flag_point, [point_id, point_data, compute_time])
+    def add_point(self, point_id, point_data, compute_time, out_point=None):
+        """ out_point: only given if the out points are sent """
+        data = [point_id, point_data, compute_time]
+        if out_point is not None:
+            data.append(out_point)
+        self.add_log(self.flag_point, data)
 
     def add_warn(self, hostname, msg):
         self.add_log(self.flag_warn, msg)
@@ -376,13 +638,17 @@ class WrapperDataHostOut(WrapperData):
     def add_error(self, point_id, msg):
         self.add_log(self.flag_error, [point_id, msg])
 
+    def add_request(self, batch_num):
+        self.add_log(self.flag_request, batch_num)
+
     def write_sample(self):
         """
         thread safe
         """
         self.mutex.acquire()
-        self.write(
-            [self.flag_sample, time.time(), [self.sample, self.flag_end]])
+        self.sample_timestamp = time.time()
+        self.write([self.flag_sample, self.sample_timestamp,
+                    self.flag_encoded])
         self.mutex.release()
 
     def get_next_log(self):
@@ -402,22 +668,69 @@ class WrapperDataHostOut(WrapperData):
         return log
 
     def write(self, row):
-        """ private """
-        self.open_file('wb')
+        """ private (must be mutex protected) """
+        flag = row[0]
+        if flag != self.flag_sample:
+            pickle.dump(row, self.write_buffer)
+            if flag in self.flush_flags or \
+                    self.write_buffer.tell() >= self.write_buffer_size:
+                self.flush_buffer()
+            elif self.flusher is None:
+                self.flusher = threading.Thread(target=self.flush_loop)
+                self.flusher.daemon = True
+                self.flusher.start()
+            return
+
+        # the sample is the last row
+        self.flush_buffer()
+        handle = self.get_write_handle()
+        pickle.dump(row, handle)
+        self.dump_sample(self.sample, handle)
+        pickle.dump(self.flag_end, handle)
+        if self.stream is None:
+            # once the sample is given, no output is needed anymore
+            self.close_file()
+        else:
+            handle.flush()
+
+    def get_write_handle(self):
+        """ private (must be mutex protected) """
+        if self.stream is not None:
+            return self.stream
 
-        # must be mutex protected
+        self.open_file('wb')
         if self.dump_head:
             WrapperData.dump(self)
             self.dump_head = False
+        return self.handle
 
-        pickle.dump(row, self.handle)
+    def flush_buffer(self):
+        """
+        private (must be mutex protected)
+        write the buffered rows at once
+        """
+        if self.write_buffer.tell() == 0:
+            return
+        handle = self.get_write_handle()
+        handle.write(self.write_buffer.getvalue())
+        handle.flush()
+        self.write_buffer = io.BytesIO()
+
+    def flush_logs(self):
+        """ thread safe: write the buffered rows now """
+        self.mutex.acquire()
+        self.flush_buffer()
+        self.mutex.release()
 
-        flag = row[0]
-        if flag == self.flag_sample:
-            # once the sample is given, no output is needed anymore
-            self.close_file()
-        else:
-            self.handle.flush()
+    def flush_loop(self):
+        """ private: write the buffered rows every flush_interval s """
+        # stop once the sample (the last row) has been written
+        while self.sample_timestamp is None:
+            time.sleep(self.flush_interval)
+            self.mutex.acquire()
+            if self.sample_timestamp is None:
+                self.flush_buffer()
+            self.mutex.release()
 
     def read(self):
         """
@@ -436,34 +749,55 @@ class WrapperDataHostOut(WrapperData):
 
             while True:
                 row = pickle.load(self.handle)
-
-                flag = row[0]
-                if flag == self.flag_sample:
-                    timestamp = row[1]
-                    data = row[2]
-                    if data[1] == self.flag_end:
-                        self.sample = data[0]
-                        self.sample_timestamp = timestamp
-                    else:
-                        raise Exception('End flag not found! The sample is'
-                                        'perhaps not complete!')
-
-                elif flag == self.flag_error or \
-                        flag == self.flag_point or \
-                        flag == self.flag_debug:
-                    self.logs.append(row)
+                self.parse_row(row, self.handle)
 
                 # no exception: store read pos
                 self.tail_pos = self.handle.tell()
 
-                if flag != self.flag_head:
+                if row[0] != self.flag_head:
                     new_data = True
 
         except EOFError as e:
-            self.close_file()
+            if not self.keep_open:
+                self.close_file()
 
         return new_data
 
+    def read_stream(self, stream):
+        """
+        Wait for the next row sent by the remote host on the stream
+        (stream mode) and store it.
+
+        return False once the stream has been closed
+        """
+        try:
+            row = pickle.load(stream)
+        except EOFError:
+            return False
+        self.parse_row(row, stream)
+        return True
+
+    def parse_row(self, row, handle):
+        """ private (handle: where the encoded sample follows the row) """
+        flag = row[0]
+        if flag == self.flag_sample:
+            timestamp = row[1]
+            data = row[2]
+            if data == self.flag_encoded:
+                data = [self.load_sample(handle), pickle.load(handle)]
+            if data[1] == self.flag_end:
+                self.sample = data[0]
+                self.sample_timestamp = timestamp
+            else:
+                raise Exception('End flag not found! The sample is'
+                                'perhaps not complete!')
+
+        elif flag == self.flag_error or \
+                flag == self.flag_point or \
+                flag == self.flag_debug or \
+                flag == self.flag_request:
+            self.logs.append(row)
+
     def get_data(self):
         self.read()
         if self.sample:
@@ -487,6 +821,158 @@ class WrapperDataHostOut(WrapperData):
         return self.sample
 
 
+class WrapperDataBatch(WrapperData):
+
+    """
+    used to give a new batch of points to a host (dynamic schedule)
+    """
+
+    head_id = "batch"
+
+    # ensure the whole file has been written
+    flag_end = "END"
+
+    def __init__(self, hostname=None, num=0):
+        super(WrapperDataBatch, self).__init__()
+        self.hostname = hostname
+        # batch number, starting from 1
+        self.num = num
+        # an empty sample means no more points to compute
+        self.sample = None
+        # global indice of the first point of the batch
+        self.first_id = 0
+
+    def get_filename(self):
+        if self.filename == None:
+            self.filename = self.head_id + '_' + str(self.hostname) + '_' + \
+                str(self.num) + self.file_suffix
+        return self.filename
+
+    def write(self):
+        self.open_file('wb')
+        WrapperData.dump(self)
+        self.dump_sample(self.sample)
+        pickle.dump(self.first_id, self.handle)
+        pickle.dump(self.flag_end, self.handle)
+        self.close_file()
+
+    def read(self):
+        """
+        raise IOError if the file does not exist, EOFError if the file is not
+        completely written
+        """
+        self.open_file()
+        try:
+            WrapperData.load(self)
+            self.sample = self.load_sample()
+            self.first_id = pickle.load(self.handle)
+            if pickle.load(self.handle) != self.flag_end:
+                raise EOFError('End flag not found!')
+        except (IndexError, KeyError, ValueError, pickle.UnpicklingError):
+            raise EOFError('The batch file is not complete!')
+        finally:
+            self.close_file()
+
+    def get_data(self):
+        self.read()
+        if self.sample:
+            print('A batch of points has been found.')
+        return self.sample
+
+
+class WrapperDataCheckpoint(WrapperData):
+
+    """
+    used to keep the out points already computed for a sample: each point is
+    appended to the file as soon as it is known
+    """
+
+    head_id = "checkpoint"
+
+    def __init__(self, fingerprint=None):
+        super(WrapperDataCheckpoint, self).__init__()
+        # identify the sample (and the wrapper computing it)
+        self.fingerprint = fingerprint
+        # point indice -> out point
+        self.points = {}
+        # end of the last point completely written in the file
+        self.tail_pos = 0
+        # protect the file
+        self.mutex = threading.Lock()
+
+    def get_filename(self):
+        if self.filename == None:
+            self.filename = self.head_id + '_' + str(self.fingerprint) + \
+                self.file_suffix
+        return self.filename
+
+    def read(self):
+        """
+        Fill the object from the file if it exists. A point not completely
+        written (the computation has been interrupted) is ignored.
+        """
+        self.points = {}
+        self.tail_pos = 0
+        if self.handle is None and not os.path.exists(self.get_fullname()):
+            return
+        self.open_file()
+        try:
+            WrapperData.load(self)
+            self.tail_pos = self.handle.tell()
+            while True:
+                point_id, out_point = pickle.load(self.handle)
+                self.points[point_id] = out_point
+                self.tail_pos = self.handle.tell()
+        except (EOFError, IndexError, KeyError, ValueError, TypeError,
+                pickle.UnpicklingError):
+            pass
+        finally:
+            self.close_file()
+            self.handle = None
+
+    def add_point(self, point_id, out_point):
+        """ thread safe: append a computed point to the file """
+        self.mutex.acquire()
+        try:
+            if self.handle is None:
+                if self.tail_pos == 0:
+                    self.open_file('wb')
+                    WrapperData.dump(self)
+                else:
+                    # drop the end of the file not completely written
+                    self.open_file('r+b')
+                    self.handle.seek(self.tail_pos)
+                    self.handle.truncate()
+            pickle.dump([point_id, out_point], self.handle)
+            self.handle.flush()
+            self.tail_pos = self.handle.tell()
+            self.points[point_id] = out_point
+        finally:
+            self.mutex.release()
+
+    def close(self):
+        """ thread safe """
+        self.mutex.acquire()
+        if self.handle is not None:
+            self.close_file()
+            self.handle = None
+        self.mutex.release()
+
+    def remove(self):
+        """ remove the file, once the whole sample is computed """
+        self.close()
+        if os.path.exists(self.get_fullname()):
+            os.remove(self.get_fullname())
+
+    def get_data(self):
+        self.read()
+        if self.points:
+            print('Computed points have been found '
+                  '(struct: [[point_id, point_content], ...] )!')
+        return [[point_id, self.points[point_id]] for point_id in
+                sorted(self.points)]
+
+
 class WrapperDataHostsIn(WrapperDataHostIn):
 
     """
@@ -503,6 +989,18 @@ class WrapperDataHostsIn(WrapperDataHostIn):
         self.hosts = []
         self.extended_check = False
         self.wrapper_file = None
+        # smallest batch of points given to a host (dynamic schedule)
+        self.min_batch_size = 1
+        # maximum number of hosts set up concurrently
+        self.max_bootstrap = 8
+        # compress the files sent to the hosts
+        self.compress_files = False
+        # keep the user files in a cache dir of the hosts between
+        # computations, indexed by their content hash
+        self.remote_cache = False
+        # the hosts send their results through their ssh connection (or a
+        # socket on localhost) instead of files that are polled
+        self.stream_results = False
 
 
 class WrapperDataHostsOut(WrapperDataHostOut):
@@ -79,7 +79,11 @@ try:
         parent_checker.start()
 
     user_wrapper.user_data = wd_core_in.user_data
-    wd_core_out.point = user_wrapper._exec(wd_core_in.point)
+    if wd_core_in.sample is not None:
+        wd_core_out.sample = wrapper_data.exec_sample(user_wrapper,
+                                                      wd_core_in.sample)
+    else:
+        wd_core_out.point = user_wrapper._exec(wd_core_in.point)
 
 
 except:
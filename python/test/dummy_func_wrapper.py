@@ -16,4 +16,8 @@ def _exec(X):
     # while k != 0:
     #    k = k - 1
 
+    # F = 666 make the wrapper fail points 2, like dummy_program.py
+    if X[1] == 666 and X[0] == 3:
+        raise Exception('point 2 fails')
+
     return [X[0] * X[1]]
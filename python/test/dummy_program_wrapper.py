@@ -53,6 +53,13 @@ def _exec(X):
                         ' (\ncmd stdout: ' + cmd_stdout + '\ncmd stderr: ' +
                         cmd_stderr + '\n)')
 
+    # F = 7 make the wrapper modify the program it was sent: the next points
+    # computed in the same workdir fail if it is not restored
+    if X[1] == 7:
+        file = open(external_program_script, 'w')
+        file.write('exit(1)\n')
+        file.close()
+
     nb_output = int(X[3])
     if X[3] > 1:
         out_sample = [Y] * nb_output
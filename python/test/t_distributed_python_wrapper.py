@@ -35,10 +35,15 @@ parser.add_argument('--point', action='store_true',
                     help='test with one point rather than a sample')
 parser.add_argument('--analytical', action='store_true',
                     help='test without separate workdir')
+parser.add_argument('--multiprocess', action='store_true',
+                    help='compute the analytical sample by a pool of '
+                    'processes')
 parser.add_argument('--cleanup', '-c',  nargs=1,
                     help='cleanup workdirs')
 parser.add_argument('--error', '-e', action='store_true',
                     help='make error')
+parser.add_argument('--modify-sent-file', action='store_true',
+                    help='the wrapper modifies the files it was sent')
 parser.add_argument('--tmpdir', '-w', nargs=1,
                     help='tmpdir')
 parser.add_argument('--sample-size', '-s', nargs=1,
@@ -47,6 +52,18 @@ parser.add_argument('--work-time', '-p', nargs=1,
                     help='number of second of computing per point')
 parser.add_argument('--nb-output', '-n', nargs=1,
                     help='number of output variable')
+parser.add_argument('--launch-mode', '-l', nargs=1,
+                    help='launch mode (process, pool, fork)')
+parser.add_argument('--batch-size', '-b', nargs=1,
+                    help='number of points computed in the same workdir')
+parser.add_argument('--dynamic-schedule', nargs=1,
+                    help='give the points to the hosts by batches of at least '
+                    'this number of points')
+parser.add_argument('--provisioning', nargs=1,
+                    help='how the files are put in the workdirs (copy, '
+                    'hardlink, reflink, recycle)')
+parser.add_argument('--stream-results', action='store_true',
+                    help='the hosts send their results through a stream')
 
 args = parser.parse_args()
 # print "args: " + str(args)
@@ -96,6 +113,22 @@ nb_output = 1
 if args.nb_output != None:
     nb_output = int(args.nb_output[0])
 
+launch_mode = "process"
+if args.launch_mode != None:
+    launch_mode = args.launch_mode[0]
+
+batch_size = 1
+if args.batch_size != None:
+    batch_size = int(args.batch_size[0])
+
+provisioning = "copy"
+if args.provisioning != None:
+    provisioning = args.provisioning[0]
+
+min_batch_size = None
+if args.dynamic_schedule != None:
+    min_batch_size = int(args.dynamic_schedule[0])
+
 
 print(("test_type:" + test_type + ",  test_point:" + str(test_point) +
       ",  test_analytical:" + str(test_analytical) +
@@ -117,24 +150,44 @@ ot.Log.Show(ot.Log.Flags() | ot.Log.INFO)
 #ResourceMap.Set("parallel-threads", "6")
 # print "Nb of thread of localhost: ", ot.ResourceMap.Get("parallel-threads")
 
+# 0: one per core of the host
+n_cores = 0
+if args.multiprocess:
+    # a pool of processes, even on a single core host
+    n_cores = 2
+
 script_dir = os.path.dirname(os.path.realpath(__file__))
 program_wrapper = script_dir + os.sep + "dummy_program_wrapper.py"
 func_wrapper = script_dir + os.sep + "dummy_func_wrapper.py"
 program = script_dir + os.sep + "dummy_program.py"
 
+wrapper_file = program_wrapper
+if args.multiprocess:
+    # the points are computed at the same time in the same workdir: the
+    # wrapper must not write files
+    wrapper_file = func_wrapper
+
 data = ['toto', 5 , [8, {'tata': 5.5}]]
 
 dist_func = otdistfunc.OpenTURNSDistributedPythonFunction(n_input=4,
                                                   n_output=nb_output,
-                                                  wrapper_file=program_wrapper,
+                                                  wrapper_file=wrapper_file,
                                                   hosts=hosts,
                                                   cleanup=cleanup,
                                                   files_to_send=[program],
                                                   tmpdir=tmpdir,
-                                                  user_data=data)
+                                                  user_data=data,
+                                                  n_cores=n_cores)
 
 if test_analytical:
     dist_func.set_separate_workdir(False)
+    dist_func.set_multiprocess(args.multiprocess)
+dist_func.set_launch_mode(launch_mode)
+dist_func.set_batch_size(batch_size)
+dist_func.set_provisioning(provisioning)
+if min_batch_size != None:
+    dist_func.set_dynamic_schedule(True, min_batch_size)
+dist_func.set_stream_results(args.stream_results)
 
 if 'win' not in sys.platform:
     # change group pid in order to avoid wrapper_launcher destroying parent process
@@ -145,10 +198,12 @@ model = ot.NumericalMathFunction(dist_func)
 
 # create sample
 inS = ot.NumericalSample(sample_size, 4)
-if not make_error:
-    F = 2
-else:
+if make_error:
     F = 666
+elif args.modify_sent_file:
+    F = 7
+else:
+    F = 2
 for i in range(sample_size):
     inS[i, 0] = i + 1
     inS[i, 1] = F
@@ -194,6 +249,9 @@ else:
         exit(1)
 
 
+# workdirs are removed in background
+dist_func.wait_cleanup()
+
 # check existing or not workdir
 check_workdir_beg = None
 check_workdir_end = None
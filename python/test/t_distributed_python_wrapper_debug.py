@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+# -*- coding: utf8 -*-
+
+# test that the hosts write their debug logs only if they would be shown
+# (need working ssh server)
+
+from __future__ import print_function, division
+import openturns as ot
+import otdistfunc
+from otdistfunc import wrapper_data
+
+import os
+import shutil
+import tempfile
+
+test_dir = tempfile.mkdtemp()
+remote_tmpdir = test_dir + os.sep + 'remote'
+os.mkdir(remote_tmpdir)
+script_dir = os.path.dirname(os.path.realpath(__file__))
+func_wrapper = script_dir + os.sep + "dummy_func_wrapper.py"
+
+# the workdirs are kept to read the host_out files
+dist_func = otdistfunc.OpenTURNSDistributedPythonFunction(
+    n_input=2, n_output=1, wrapper_file=func_wrapper, hosts=['localhost'],
+    tmpdir=test_dir, remote_tmpdir=remote_tmpdir, cleanup='no')
+dist_func.set_launch_mode('pool')
+sample = [[float(i), 2.0] for i in range(4)]
+
+
+def count_debug_logs():
+    """ number of debug logs in the host_out file of the last computation """
+    wd_host_out = wrapper_data.WrapperDataHostOut()
+    wd_host_out.set_hostname('localhost')
+    wd_host_out.set_dirname(remote_tmpdir + os.sep +
+                            dist_func.wd_hosts_in.workdir_basename)
+    wd_host_out.read()
+    return len([log for log in wd_host_out.logs
+                if log[0] == wd_host_out.flag_debug])
+
+flags = ot.Log.Flags()
+
+print('== test without debug')
+ot.Log.Show(flags & ~ot.Log.DBG)
+print(dist_func._exec_sample(sample))
+dist_func.wait_cleanup()
+print(count_debug_logs())
+
+print('== test with debug')
+ot.Log.Show(flags | ot.Log.DBG)
+print(dist_func._exec_sample(sample))
+dist_func.wait_cleanup()
+print(count_debug_logs() > 0)
+
+ot.Log.Show(flags)
+
+
+shutil.rmtree(test_dir)
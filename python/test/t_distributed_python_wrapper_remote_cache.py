@@ -0,0 +1,83 @@
+#! /usr/bin/env python
+# -*- coding: utf8 -*-
+
+# test the cache of the files sent to the hosts
+# (need working ssh server)
+
+from __future__ import print_function, division
+import otdistfunc
+from otdistfunc import host_dispatcher
+
+import os
+import shutil
+import tempfile
+
+test_dir = tempfile.mkdtemp()
+remote_tmpdir = test_dir + os.sep + 'remote'
+os.mkdir(remote_tmpdir)
+cache_dir = remote_tmpdir + os.sep + host_dispatcher.remote_cache_dir
+
+# the points are multiplied by the content of the factor file
+factor_file = test_dir + os.sep + 'factor.txt'
+wrapper_file = test_dir + os.sep + 'factor_wrapper.py'
+handle = open(wrapper_file, 'w')
+handle.write('def _exec(X):\n'
+             '    return [X[0] * float(open("factor.txt").read())]\n')
+handle.close()
+
+
+def write_factor(factor):
+    handle = open(factor_file, 'w')
+    handle.write(str(factor))
+    handle.close()
+
+
+# localhost shares the filesystem: the files would be copied in the workdir
+# without using the cache. Do as if the hosts did not share it.
+create_probe = host_dispatcher.HostDispatcher.create_probe
+
+
+def create_no_probe(self):
+    create_probe(self)
+    self.remove_probe()
+
+host_dispatcher.HostDispatcher.create_probe = create_no_probe
+
+write_factor(2)
+dist_func = otdistfunc.OpenTURNSDistributedPythonFunction(
+    n_input=2, n_output=1, wrapper_file=wrapper_file, hosts=['localhost'],
+    files_to_send=[factor_file], tmpdir=test_dir,
+    remote_tmpdir=remote_tmpdir)
+dist_func.set_launch_mode('pool')
+dist_func.set_remote_cache(True)
+sample = [[float(i), 1.0] for i in range(4)]
+
+print('== test remote cache')
+print(dist_func._exec_sample(sample))
+dist_func.wait_cleanup()
+# the factor and the wrapper
+cached_files = sorted(os.listdir(cache_dir))
+print(len(cached_files))
+# mark the cached files: a file sent again would lose the mark
+for cached_file in cached_files:
+    os.utime(cache_dir + os.sep + cached_file, (0, 0))
+
+# the files of the cache are used
+print(dist_func._exec_sample(sample))
+dist_func.wait_cleanup()
+print(sorted(os.listdir(cache_dir)) == cached_files)
+print([os.stat(cache_dir + os.sep + cached_file).st_mtime for cached_file in
+       cached_files])
+
+# the new content of the factor is sent
+write_factor(3)
+print(dist_func._exec_sample(sample))
+dist_func.wait_cleanup()
+print(len(os.listdir(cache_dir)))
+print([os.stat(cache_dir + os.sep + cached_file).st_mtime for cached_file in
+       cached_files])
+# the workdirs are removed, the cache is kept
+print(os.listdir(remote_tmpdir))
+
+
+shutil.rmtree(test_dir)
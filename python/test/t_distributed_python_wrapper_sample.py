@@ -0,0 +1,145 @@
+#! /usr/bin/env python
+# -*- coding: utf8 -*-
+
+# test the computation of a sample on the local host: points already known,
+# background computation
+
+from __future__ import print_function, division
+import otdistfunc
+
+import os
+import shutil
+import tempfile
+import time
+
+test_dir = tempfile.mkdtemp()
+# the point [3, 2] fails while the fail file exists, the point [-1, 2]
+# creates the started file then waits for the removal of the wait file
+fail_flag = test_dir + os.sep + 'fail'
+started_flag = test_dir + os.sep + 'started'
+wait_flag = test_dir + os.sep + 'wait'
+wrapper_file = test_dir + os.sep + 'flag_wrapper.py'
+handle = open(wrapper_file, 'w')
+handle.write('import os\nimport time\n\n\n'
+             'def _exec(X):\n'
+             '    if X[0] == 3 and os.path.exists(' + repr(fail_flag) + '):\n'
+             '        raise ValueError("point 3 fails")\n'
+             '    if X[0] == -1:\n'
+             '        open(' + repr(started_flag) + ', "w").close()\n'
+             '        while os.path.exists(' + repr(wait_flag) + '):\n'
+             '            time.sleep(0.01)\n'
+             '    return [X[0] * X[1]]\n')
+handle.close()
+
+
+def new_function():
+    dist_func = otdistfunc.OpenTURNSDistributedPythonFunction(
+        n_input=2, n_output=1, wrapper_file=wrapper_file, tmpdir=test_dir)
+    dist_func.set_launch_mode('pool')
+    return dist_func
+
+# the points computed, by indice in the sample
+computed = []
+
+
+def on_point(global_id, in_point, out_point):
+    computed.append(global_id)
+
+sample = [[float(i), 2.0] for i in range(6)]
+
+
+print('== test checkpoint resume')
+checkpoint_dir = test_dir + os.sep + 'checkpoint'
+os.mkdir(checkpoint_dir)
+dist_func = new_function()
+dist_func.set_checkpoint(checkpoint_dir)
+dist_func.set_on_point(on_point)
+open(fail_flag, 'w').close()
+# the failed point is not given
+print(dist_func._exec_sample(sample))
+print('computed ' + str(sorted(computed)))
+print('checkpoint files ' + str(len(os.listdir(checkpoint_dir))))
+# only the point that failed is computed again
+os.remove(fail_flag)
+del computed[:]
+print(dist_func._exec_sample(sample))
+print('computed ' + str(sorted(computed)))
+print('checkpoint files ' + str(len(os.listdir(checkpoint_dir))))
+dist_func.wait_cleanup()
+
+
+print('== test tolerance cache')
+dist_func = new_function()
+# one tolerance per input
+try:
+    dist_func.set_tolerance_cache(test_dir + os.sep + 'tolerance.pkl', [0.1])
+except Exception as exc:
+    print(exc)
+dist_func.set_tolerance_cache(test_dir + os.sep + 'tolerance.pkl', [0.1, 0.])
+print(dist_func._exec_sample(sample))
+print(dist_func._exec_sample([[0.05, 2.], [0.2, 2.], [5., 2.]]))
+print(dist_func.get_tolerance_cache_stats())
+dist_func.wait_cleanup()
+
+
+print('== test duplicated points')
+dist_func = new_function()
+dist_func.set_on_point(on_point)
+dup_sample = [[1., 2.], [2., 2.], [1., 2.], [3., 2.], [2., 2.], [1., 2.]]
+# computed anyway by default
+del computed[:]
+print(dist_func._exec_sample(dup_sample))
+print('computed ' + str(sorted(computed)))
+dist_func.set_remove_duplicates(True)
+del computed[:]
+print(dist_func._exec_sample(dup_sample))
+print('computed ' + str(sorted(computed)))
+dist_func.wait_cleanup()
+
+
+print('== test submit_sample')
+dist_func = new_function()
+futures = [dist_func.submit_sample(sample),
+           dist_func.submit_sample(dup_sample)]
+print(futures[0].result() == dist_func._exec_sample(sample))
+print(futures[1].result() == dist_func._exec_sample(dup_sample))
+print([future.done() for future in futures])
+print(futures[1].progress())
+# the computations on the current host are done one after the other: the
+# second one is cancelled before it starts
+open(wait_flag, 'w').close()
+future = dist_func.submit_sample([[-1., 2.]])
+while not os.path.exists(started_flag):
+    time.sleep(0.01)
+cancelled_future = dist_func.submit_sample(sample)
+print(cancelled_future.cancel())
+# the first one can not be cancelled once started
+print([future.cancel(), future.cancelled()])
+os.remove(wait_flag)
+print(future.result())
+try:
+    cancelled_future.result()
+except Exception as exc:
+    print(exc)
+print([cancelled_future.done(), cancelled_future.cancelled()])
+print(future.cancel())
+dist_func.wait_cleanup()
+
+
+print('== test progress')
+dist_func = new_function()
+dist_func.set_separate_workdir(False)
+os.remove(started_flag)
+open(wait_flag, 'w').close()
+# the points computed before the waiting one are counted
+future = dist_func.submit_sample([[1., 2.], [2., 2.], [-1., 2.], [4., 2.]])
+while not os.path.exists(started_flag):
+    time.sleep(0.01)
+print(future.progress())
+os.remove(wait_flag)
+print(future.result())
+print(future.progress())
+dist_func.wait_cleanup()
+
+
+shutil.rmtree(test_dir)
@@ -0,0 +1,47 @@
+#! /usr/bin/env python
+# -*- coding: utf8 -*-
+
+# test the session: the core dispatcher of a host computes several samples
+# (need working ssh server)
+
+from __future__ import print_function, division
+import otdistfunc
+
+import os
+import shutil
+import tempfile
+
+test_dir = tempfile.mkdtemp()
+remote_tmpdir = test_dir + os.sep + 'remote'
+os.mkdir(remote_tmpdir)
+script_dir = os.path.dirname(os.path.realpath(__file__))
+func_wrapper = script_dir + os.sep + "dummy_func_wrapper.py"
+
+dist_func = otdistfunc.OpenTURNSDistributedPythonFunction(
+    n_input=2, n_output=1, wrapper_file=func_wrapper, hosts=['localhost'],
+    tmpdir=test_dir, remote_tmpdir=remote_tmpdir)
+dist_func.set_launch_mode('pool')
+dist_func.set_session(True, 600)
+
+print('== test session')
+print(dist_func._exec_sample([[float(i), 2.0] for i in range(4)]))
+session = dist_func.session
+# the remote workdir is kept between the samples
+print(len(os.listdir(remote_tmpdir)))
+print(dist_func._exec_sample([[float(i), 3.0] for i in range(5)]))
+print(dist_func.session is session)
+print(len(os.listdir(remote_tmpdir)))
+
+dist_func.close()
+print(dist_func.session)
+dist_func.wait_cleanup()
+print(len(os.listdir(remote_tmpdir)))
+# a new session is started
+print(dist_func._exec_sample([[1., 4.0]]))
+print(dist_func.session is session)
+dist_func.close()
+dist_func.wait_cleanup()
+print(len(os.listdir(remote_tmpdir)))
+
+
+shutil.rmtree(test_dir)
@@ -0,0 +1,58 @@
+#! /usr/bin/env python
+# -*- coding: utf8 -*-
+
+# test hosts sharing the workdir with the current host: the files are copied
+# once, the workdir is removed once computed
+# (need working ssh server)
+
+from __future__ import print_function, division
+import otdistfunc
+from otdistfunc import host_dispatcher
+from otdistfunc import remote_communicator
+
+import os
+import shutil
+import tempfile
+
+test_dir = tempfile.mkdtemp()
+script_dir = os.path.dirname(os.path.realpath(__file__))
+func_wrapper = script_dir + os.sep + "dummy_func_wrapper.py"
+program = script_dir + os.sep + "dummy_program.py"
+
+# count the copies of the files in the shared workdir and the transfers
+copies = []
+transfers = []
+copy_shared_files = host_dispatcher.HostDispatcher.copy_shared_files
+send_files = remote_communicator.RemoteCommunicatorSSH.send_files
+
+
+def count_copy_shared_files(self, files):
+    copies.append(self.shared_files_copied)
+    copy_shared_files(self, files)
+
+
+def count_send_files(self, *args, **kwargs):
+    transfers.append(self.host)
+    return send_files(self, *args, **kwargs)
+
+host_dispatcher.HostDispatcher.copy_shared_files = count_copy_shared_files
+remote_communicator.RemoteCommunicatorSSH.send_files = count_send_files
+
+# two names of the current host: the same host can not be given twice
+dist_func = otdistfunc.OpenTURNSDistributedPythonFunction(
+    n_input=2, n_output=1, wrapper_file=func_wrapper,
+    hosts=['localhost', '127.0.0.1'], files_to_send=[program],
+    tmpdir=test_dir)
+dist_func.set_launch_mode('pool')
+
+print('== test shared workdir')
+print(dist_func._exec_sample([[float(i), 2.0] for i in range(6)]))
+# each host uses the files, they are copied by the first one
+print(len(copies))
+print(copies.count(False))
+print(transfers)
+dist_func.wait_cleanup()
+print(os.listdir(test_dir))
+
+
+shutil.rmtree(test_dir)
@@ -28,6 +28,11 @@ else:
 os.system(start_script + default_param + " --point ")
 os.system(start_script + default_param + " --analytical ")
 os.system(start_script + default_param + " --point --analytical ")
+os.system(start_script + default_param +
+          " --sample-size 10 --work-time 0.1 --analytical --multiprocess ")
+os.system(start_script + default_param +
+          " --sample-size 10 --work-time 0.1 --analytical --multiprocess "
+          "--error ")
 
 os.system(start_script + default_param +
           "--sample-size 50 --work-time 0.1 ")
@@ -38,6 +43,28 @@ os.system(start_script + default_param +
 os.system(start_script + default_param +
           "--sample-size 1 ")
 
+os.system(start_script + default_param +
+          "--sample-size 5 --work-time 0.1 --launch-mode pool ")
+os.system(start_script + default_param +
+          " --sample-size 4 --work-time 0.1 --error --launch-mode pool")
+if 'win' not in sys.platform:
+    os.system(start_script + default_param +
+              "--sample-size 5 --work-time 0.1 --launch-mode fork ")
+os.system(start_script + default_param +
+          "--sample-size 5 --work-time 0.1 --batch-size 2 ")
+
+os.system(start_script + default_param +
+          "--sample-size 5 --work-time 0.1 --provisioning hardlink ")
+os.system(start_script + default_param +
+          "--sample-size 5 --work-time 0.1 --provisioning recycle ")
+os.system(start_script + default_param +
+          "--sample-size 5 --work-time 0.1 --provisioning recycle "
+          "--batch-size 2 ")
+# the modified program is restored for the next point
+os.system(start_script + default_param +
+          "--sample-size 5 --work-time 0.1 --provisioning recycle "
+          "--modify-sent-file ")
+
 os.system(start_script + default_param +
           "--sample-size 5 --work-time 0.1 --cleanup no ")
 os.system(start_script + default_param +
@@ -54,3 +81,20 @@ os.system(start_script + default_param +
           " --sample-size 4 --work-time 0.1 --error --cleanup no")
 os.system(start_script + default_param +
           " --sample-size 4 --work-time 0.1 --error --cleanup all")
+
+if test_type == "remote":
+    # the hosts ask for the next points while computing
+    os.system(start_script + default_param +
+              "--sample-size 20 --work-time 0.1 --dynamic-schedule 1 ")
+    os.system(start_script + default_param +
+              "--sample-size 20 --work-time 0.1 --dynamic-schedule 3 "
+              "--batch-size 2 ")
+    os.system(start_script + default_param +
+              " --sample-size 10 --work-time 0.1 --error --dynamic-schedule 2")
+    # the results come through a stream rather than the result files, the
+    # debug mode checks that the launcher started
+    os.system(start_script + default_param +
+              "--sample-size 10 --work-time 0.1 --stream-results ")
+    os.system(start_script + default_param +
+              " --sample-size 4 --work-time 0.1 --error --stream-results "
+              "--debug")
@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import print_function, division
+from otdistfunc import point_cache
+import os
+import shutil
+import tempfile
+import time
+
+test_dir = tempfile.mkdtemp()
+
+
+print('== test PointCache')
+cache = point_cache.PointCache(test_dir + os.sep + 'cache.db', max_points=3)
+keys = cache.get_keys('context', [[0., 1.], [1., 1.], [2., 1.], [3., 1.]])
+# same point in another context
+print(cache.get_keys('other', [[0., 1.]])[0] != keys[0])
+for point_id in range(3):
+    cache.put({keys[point_id]: [float(point_id)]})
+    # distinct last use times
+    time.sleep(0.01)
+print(sorted(cache.get(keys[:1] + keys[3:]).values()))
+print([cache.hits, cache.misses, cache.size()])
+# the least recently used point is removed
+time.sleep(0.01)
+cache.put({keys[3]: [3.]})
+found = cache.get(keys)
+print([found.get(key) for key in keys])
+print([cache.hits, cache.misses, cache.size()])
+cache.close()
+# the points are kept in the file
+cache = point_cache.PointCache(test_dir + os.sep + 'cache.db', max_points=3)
+print(cache.size())
+cache.close()
+
+
+print('== test ToleranceCache')
+filename = test_dir + os.sep + 'tolerance.pkl'
+cache = point_cache.ToleranceCache(filename, [0.1, 0.5])
+cache.load('context')
+# inserted in the tree one by one
+cache.put([[[float(i), float(i % 3)], [float(i)]] for i in range(10)])
+cache.put([[[6.15, 0.], [6.15]]])
+# within the tolerance, just outside on each dimension, exact
+in_sample = [[4.0999, 1.4999], [4.1001, 1.], [4., 1.5001], [0., 0.]]
+print(cache.get(in_sample))
+# the closest point is given
+print(cache.get([[6.09, 0.]]))
+print([cache.hits, cache.misses, cache.size()])
+# balanced tree built from the file
+cache = point_cache.ToleranceCache(filename, [0.1, 0.5])
+cache.load('context')
+print(cache.get(in_sample))
+print(cache.get([[6.09, 0.]]))
+print([cache.hits, cache.misses, cache.size()])
+# the points of another context are dropped
+cache.load('other')
+print(cache.get([[0., 0.]]))
+
+
+shutil.rmtree(test_dir)
@@ -52,6 +52,7 @@ wd.n_cores = 2
 wd.files_to_send = ['us.py']
 wd.separate_workdir = False
 wd.cleanup = 'all'
+wd.launch_mode = 'pool'
 wd.write()
 # read
 wd_r = wrapper_data.WrapperDataHostIn()
@@ -68,6 +69,7 @@ print(wd_r.n_cores)
 print(wd_r.files_to_send)
 print(wd_r.separate_workdir)
 print(wd_r.cleanup)
+print(wd_r.launch_mode)
 # get data
 print(wrapper_data.get_data(wd.get_fullname()))
 # clean
@@ -108,6 +110,8 @@ wd = wrapper_data.WrapperDataHostOut(remote=True)
 wd.hostname = "toto"
 wd.add_point(1, [8, 5, 6], 45)
 wd.add_point(3, [5, 3, 2], 42)
+# the logs are buffered
+wd.flush_logs()
 # read
 wd_r = wrapper_data.WrapperDataHostOut()
 wd_r.hostname = wd.hostname
@@ -118,6 +122,41 @@ print(wrapper_data.get_data(wd.get_fullname()))
 #os.remove(wd.get_fullname())
 
 
+print('== test float64 sample codec')
+# write
+wd = wrapper_data.WrapperDataHostOut(remote=True)
+wd.hostname = "titi"
+wd.sample = [[1.5, -2.0], [3.25, 1e300], [0.0, 7.0]]
+wd.add_point(0, [1.5, -2.0], 3)
+wd.write_sample()
+# a not completely written sample is not read
+size = os.path.getsize(wd.get_fullname())
+with open(wd.get_fullname(), 'rb') as handle:
+    data = handle.read()
+with open(wd.get_fullname(), 'wb') as handle:
+    handle.write(data[:size - 20])
+wd_r = wrapper_data.WrapperDataHostOut()
+wd_r.hostname = wd.hostname
+wd_r.keep_open = True
+wd_r.read()
+print(wd_r.sample)
+# read the end
+with open(wd.get_fullname(), 'wb') as handle:
+    handle.write(data)
+wd_r.read()
+print(wd_r.sample)
+wd_r.close_file()
+os.remove(wd.get_fullname())
+# ints are converted by the float64 codec
+wd = wrapper_data.WrapperDataHostIn()
+wd.hostname = "titi"
+wd.sample = [[2, 3, 4], [5, 6, 2]]
+wd.sample_codec = 'float64'
+wd.write()
+print(wrapper_data.get_data(wd.get_fullname()))
+os.remove(wd.get_fullname())
+
+
 # print '== test WrapperDataHostsIn'
 # print '== test WrapperDataHostsOut'
 